@@ -0,0 +1,76 @@
+import json
+from collections import defaultdict
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.utils import ConfigurableFieldSpec
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint
+
+from ..db.redis import get_redis
+
+class RedisCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer that keeps the latest checkpoint of each thread
+    in Redis, serialized as JSON, with a sliding TTL.
+
+    Only the async interface is supported, which is what ``ainvoke`` uses.
+    A blocking Redis client would stall the event loop, so the sync methods
+    LangGraph declares abstract just refuse.
+    """
+
+    key_prefix: str = "agent:checkpoint:"
+    ttl_seconds: int = 7 * 24 * 3600
+
+    @property
+    def config_specs(self) -> list[ConfigurableFieldSpec]:
+        return [
+            ConfigurableFieldSpec(
+                id="thread_id",
+                annotation=str,
+                name="Thread ID",
+                description=None,
+                default="",
+                is_shared=True,
+            ),
+        ]
+
+    def _key(self, config: RunnableConfig) -> str:
+        return self.key_prefix + config["configurable"]["thread_id"]
+
+    def get(self, config: RunnableConfig) -> Optional[Checkpoint]:
+        raise NotImplementedError("RedisCheckpointSaver is async only; use ainvoke()")
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint) -> None:
+        raise NotImplementedError("RedisCheckpointSaver is async only; use ainvoke()")
+
+    async def aget(self, config: RunnableConfig) -> Optional[Checkpoint]:
+        redis = await get_redis()
+        data = await redis.get(self._key(config))
+        if data is None:
+            return None
+        return _loads(data)
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint) -> None:
+        redis = await get_redis()
+        await redis.set(self._key(config), _dumps(checkpoint), ex=self.ttl_seconds)
+
+    async def adelete(self, config: RunnableConfig) -> bool:
+        redis = await get_redis()
+        return bool(await redis.delete(self._key(config)))
+
+def _dumps(checkpoint: Checkpoint) -> str:
+    return json.dumps(checkpoint)
+
+def _loads(data: bytes) -> Checkpoint:
+    raw = json.loads(data)
+    # LangGraph relies on these being defaultdicts when it bumps versions
+    versions_seen = defaultdict(lambda: defaultdict(int))
+    for node, seen in raw["versions_seen"].items():
+        versions_seen[node] = defaultdict(int, seen)
+    return Checkpoint(
+        v=raw["v"],
+        ts=raw["ts"],
+        channel_values=raw["channel_values"],
+        channel_versions=defaultdict(int, raw["channel_versions"]),
+        versions_seen=versions_seen,
+    )
@@ -0,0 +1,116 @@
+from typing import Dict, List, TypedDict
+
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from langgraph.graph import StateGraph, END
+
+from ..core.config import settings
+from ..core.deadlines import with_deadline
+from ..core.tokens import count_message_tokens, count_tokens
+from .checkpoint import RedisCheckpointSaver
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an assistant. "
+    "Keep facts, decisions, names and open questions; drop small talk. "
+    "Answer with the updated summary only, in at most 200 words.\n\n"
+    "Current summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+class ConversationState(TypedDict):
+    question: str
+    messages: List[Dict[str, str]]
+    summary: str
+    answer: str
+
+_graph = None
+_checkpointer = None
+
+def _thread_config(user_id: str, session_id: str) -> dict:
+    # Scope threads by user so a session id can't be used to read another user's history
+    return {"configurable": {"thread_id": f"{user_id}:{session_id}"}}
+
+def _history_tokens(summary: str, messages: List[Dict[str, str]]) -> int:
+    return count_tokens(summary) + count_message_tokens(messages)
+
+async def _summarize(summary: str, messages: List[Dict[str, str]]) -> str:
+    from .orchestrator import get_llm
+
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = await with_deadline(get_llm().ainvoke([
+        HumanMessage(content=SUMMARY_PROMPT.format(summary=summary or "(none)", messages=transcript))
+    ]))
+    return response.content
+
+async def prepare_context(state: ConversationState) -> dict:
+    """
+    Append the new question and fold older turns into the summary once the
+    history exceeds its token budget
+    """
+    messages = list(state.get("messages") or [])
+    summary = state.get("summary") or ""
+    messages.append({"role": "user", "content": state["question"]})
+
+    keep = settings.AGENT_SESSION_KEEP_MESSAGES
+    if (
+        len(messages) > keep
+        and _history_tokens(summary, messages) > settings.AGENT_SESSION_MAX_HISTORY_TOKENS
+    ):
+        summary = await _summarize(summary, messages[:-keep])
+        messages = messages[-keep:]
+
+    return {"messages": messages, "summary": summary}
+
+async def respond(state: ConversationState) -> dict:
+    """
+    Answer the latest question using the summary and the recent messages
+    """
+    from .orchestrator import get_llm
+
+    prompt = [SystemMessage(content=SYSTEM_PROMPT)]
+    if state.get("summary"):
+        prompt.append(SystemMessage(content=f"Summary of the conversation so far:\n{state['summary']}"))
+    for message in state["messages"]:
+        if message["role"] == "user":
+            prompt.append(HumanMessage(content=message["content"]))
+        else:
+            prompt.append(AIMessage(content=message["content"]))
+
+    response = await with_deadline(get_llm().ainvoke(prompt))
+    messages = state["messages"] + [{"role": "assistant", "content": response.content}]
+    return {"messages": messages, "answer": response.content}
+
+def get_checkpointer() -> RedisCheckpointSaver:
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = RedisCheckpointSaver(ttl_seconds=settings.AGENT_SESSION_TTL_SECONDS)
+    return _checkpointer
+
+def get_conversation_graph():
+    """
+    Get the compiled conversation graph, checkpointed per session in Redis
+    """
+    global _graph
+    if _graph is None:
+        workflow = StateGraph(ConversationState)
+        workflow.add_node("prepare_context", prepare_context)
+        workflow.add_node("respond", respond)
+        workflow.set_entry_point("prepare_context")
+        workflow.add_edge("prepare_context", "respond")
+        workflow.add_edge("respond", END)
+        _graph = workflow.compile(checkpointer=get_checkpointer())
+    return _graph
+
+async def run_conversation_turn(user_id: str, session_id: str, prompt: str) -> str:
+    """
+    Run one turn of a session and return the assistant's answer
+    """
+    graph = get_conversation_graph()
+    state = await graph.ainvoke({"question": prompt}, _thread_config(user_id, session_id))
+    return state["answer"]
+
+async def delete_conversation(user_id: str, session_id: str) -> bool:
+    """
+    Drop a session's checkpointed history
+    """
+    return await get_checkpointer().adelete(_thread_config(user_id, session_id))
@@ -1,11 +1,11 @@
 import time
-from typing import Dict, Any, List
-from langgraph.graph import StateGraph, END
-from langchain_openai import AzureChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
+from typing import Dict, Any, List, Optional
 
 from ..core.config import settings
+from ..core.deadlines import with_deadline
+
+# LangChain and the OpenAI client are imported inside the functions that use
+# them so pods that never run an agent don't pay their import cost.
 
 AGENT_TEMPLATES = [
     {
@@ -25,18 +25,34 @@ AGENT_TEMPLATES = [
     }
 ]
 
+# Agent types that can hold a server-side conversation session
+SESSION_AGENT_TYPES = {"default"}
+
+class UnsupportedSession(Exception):
+    """
+    Raised when a session is requested for an agent type that has none
+    """
+
+_llms: Dict[float, Any] = {}
+
 def get_llm(temperature=0):
-    """Get Azure OpenAI LLM instance"""
-    return AzureChatOpenAI(
-        azure_deployment=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
-        openai_api_version=settings.AZURE_OPENAI_API_VERSION,
-        azure_endpoint=settings.AZURE_OPENAI_API_BASE,
-        api_key=settings.AZURE_OPENAI_API_KEY,
-        temperature=temperature,
-    )
+    """Get Azure OpenAI LLM instance, reusing its HTTP connection pool"""
+    from langchain_openai import AzureChatOpenAI
+    
+    if temperature not in _llms:
+        _llms[temperature] = AzureChatOpenAI(
+            azure_deployment=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+            openai_api_version=settings.AZURE_OPENAI_API_VERSION,
+            azure_endpoint=settings.AZURE_OPENAI_API_BASE,
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            temperature=temperature,
+        )
+    return _llms[temperature]
 
 def create_default_agent():
     """Create a simple agent that just calls the LLM"""
+    from langchain.prompts import ChatPromptTemplate
+    from langchain.schema import StrOutputParser
     
     prompt = ChatPromptTemplate.from_template(
         "You are a helpful assistant. Answer the following question: {question}"
@@ -45,30 +61,58 @@ def create_default_agent():
     model = get_llm()
     return prompt | model | StrOutputParser()
 
-async def run_agent(user_id: str, prompt: str, agent_type: str = "default", parameters: Dict[str, Any] = {}):
+async def run_agent(
+    user_id: str,
+    prompt: str,
+    agent_type: str = "default",
+    parameters: Dict[str, Any] = {},
+    session_id: Optional[str] = None
+):
     """
-    Run an agent with the given prompt and parameters
+    Run an agent with the given prompt and parameters.
+    With a session_id, the prompt is one turn of a server-side conversation,
+    which only the agent types in SESSION_AGENT_TYPES support.
     """
+    if session_id and agent_type not in SESSION_AGENT_TYPES:
+        raise UnsupportedSession(f"Sessions are not supported by the {agent_type!r} agent")
+
     start_time = time.time()
     
+    sources = []
+    
     # Logic to dispatch to specific agent type
-    if agent_type == "default":
+    if session_id:
+        from .conversation import run_conversation_turn
+        answer = await run_conversation_turn(user_id, session_id, prompt)
+    elif agent_type == "sql" and settings.SQL_AGENT_DATABASE_URL:
+        from .sql_agent import run_sql_agent
+        result = await run_sql_agent(prompt)
+        answer, sources = result["answer"], result["sources"]
+    elif agent_type == "default":
         agent = create_default_agent()
-        answer = await agent.ainvoke({"question": prompt})
+        answer = await with_deadline(agent.ainvoke({"question": prompt}))
     else:
         # For now, fallback to default agent
         agent = create_default_agent()
-        answer = await agent.ainvoke({"question": prompt})
+        answer = await with_deadline(agent.ainvoke({"question": prompt}))
     
     # Prepare response
     processing_time = time.time() - start_time
     return {
         "answer": answer,
-        "sources": [],  # No sources for default agent
+        "sources": sources,
         "processing_time": processing_time,
         "model": "azure-gpt4",
+        "session_id": session_id,
     }
 
+async def end_session(user_id: str, session_id: str) -> bool:
+    """
+    Delete a conversation session
+    """
+    from .conversation import delete_conversation
+    return await delete_conversation(user_id, session_id)
+
 async def list_agent_templates():
     """
     List available agent templates
@@ -0,0 +1,198 @@
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema import HumanMessage
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.deadlines import with_deadline
+from ..db.sql import get_sql_engine, inspect_schema, run_read_query
+
+SQL_PROMPT = (
+    "You write {dialect} SQL for data analysis. Using only the tables below, write a single "
+    "read-only SELECT query that answers the question. Answer with the SQL only.\n\n"
+    "Tables:\n{tables}\n\nQuestion: {question}"
+)
+
+# Introspected schema, shared by every question until it expires
+_schema_cache = TTLCache(max_entries=1, ttl_seconds=settings.SQL_AGENT_SCHEMA_TTL_SECONDS)
+# Generated SQL by normalized question, and query results by normalized SQL
+_sql_cache = TTLCache(
+    max_entries=settings.SQL_AGENT_RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SQL_AGENT_RESULT_CACHE_TTL_SECONDS,
+)
+_result_cache = TTLCache(
+    max_entries=settings.SQL_AGENT_RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SQL_AGENT_RESULT_CACHE_TTL_SECONDS,
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_QUOTED_IDENTIFIER = re.compile(r'("(?:[^"]|"")*"|`[^`]*`)')
+# Either of the above, whichever starts first
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`)""")
+# Keywords and functions a read-only query has no use for; data-modifying
+# CTEs, SELECT INTO and session changes all need one of them
+_WRITE_WORDS = re.compile(
+    r"\b(insert|update|delete|merge|upsert|create|alter|drop|truncate|grant|revoke|"
+    r"copy|call|exec|execute|do|lock|vacuum|analyze|into|set|set_config|reset|attach|detach|pragma)\b",
+    re.IGNORECASE,
+)
+_CODE_FENCE = re.compile(r"```(?:sql)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+async def get_schema() -> Dict[str, Dict[str, Any]]:
+    """
+    Get the database schema, introspecting it only when the cache expired
+    """
+    schema = _schema_cache.get("schema")
+    if schema is None:
+        schema = await asyncio.to_thread(inspect_schema)
+        _schema_cache.set("schema", schema)
+    return schema
+
+def _terms(text: str) -> set:
+    terms = set()
+    for word in _WORD.findall(text.lower()):
+        terms.add(word)
+        # Crude singular so "orders" matches an "order" column and vice versa
+        if len(word) > 3 and word.endswith("s"):
+            terms.add(word[:-1])
+    return terms
+
+def select_tables(question: str, schema: Dict[str, Dict[str, Any]], max_tables: int) -> List[str]:
+    """
+    Pick the tables most relevant to a question by matching its words
+    against table and column names, then add the tables they reference
+    so joins can be written
+    """
+    terms = _terms(question)
+    scores = {}
+    for table, info in schema.items():
+        score = 3 * len(_terms(table.replace("_", " ")) & terms)
+        for column, _ in info["columns"]:
+            score += len(_terms(column.replace("_", " ")) & terms)
+        scores[table] = score
+
+    ranked = [t for t in sorted(schema, key=lambda t: (-scores[t], t)) if scores[t] > 0]
+    if not ranked:
+        return sorted(schema)[:max_tables]
+
+    selected = ranked[:max_tables]
+    for table in list(selected):
+        for reference in schema[table]["references"].values():
+            referred = reference.split(".")[0]
+            if len(selected) < max_tables and referred not in selected:
+                selected.append(referred)
+    return selected
+
+def describe_tables(schema: Dict[str, Dict[str, Any]], tables: List[str]) -> str:
+    lines = []
+    for table in tables:
+        info = schema[table]
+        columns = []
+        for name, type_ in info["columns"]:
+            reference = info["references"].get(name)
+            columns.append(f"{name} {type_}" + (f" -> {reference}" if reference else ""))
+        lines.append(f"{table}({', '.join(columns)})")
+    return "\n".join(lines)
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize a query for use as a cache key: case and whitespace are
+    ignored outside string literals and quoted identifiers, as is a
+    trailing semicolon
+    """
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    return "".join(
+        part if part[:1] in ("'", '"', "`") else _WHITESPACE.sub(" ", part.lower())
+        for part in parts
+    )
+
+def extract_sql(text: str) -> str:
+    match = _CODE_FENCE.search(text)
+    if match:
+        text = match.group(1)
+    return text.strip().rstrip(";").strip()
+
+def check_read_only(sql: str) -> None:
+    """
+    Reject anything but a single SELECT (or WITH ... SELECT) statement that
+    doesn't write or change session settings. Each query also runs in a
+    read-only transaction; this just fails early.
+    """
+    code = _QUOTED_IDENTIFIER.sub('""', _STRING_LITERAL.sub("''", sql))
+    if ";" in code:
+        raise ValueError("Only a single statement can be run")
+    first_word = code.split(None, 1)[0].lower() if code.strip() else ""
+    if first_word not in ("select", "with"):
+        raise ValueError("Only SELECT queries can be run")
+    write = _WRITE_WORDS.search(code)
+    if write:
+        raise ValueError(f"Queries may not use {write.group(1).upper()}")
+
+def format_result(sql: str, columns: List[str], rows: List[tuple], truncated: bool) -> str:
+    lines = [f"```sql\n{sql}\n```", ""]
+    if not rows:
+        lines.append("The query returned no rows.")
+        return "\n".join(lines)
+    lines.append("| " + " | ".join(columns) + " |")
+    lines.append("| " + " | ".join("---" for _ in columns) + " |")
+    for row in rows:
+        lines.append("| " + " | ".join("" if v is None else str(v) for v in row) + " |")
+    if truncated:
+        lines.append("")
+        lines.append(f"Showing the first {len(rows)} rows.")
+    return "\n".join(lines)
+
+async def generate_sql(question: str) -> Tuple[str, List[str]]:
+    """
+    Ask the LLM for a query answering the question, describing only the
+    relevant tables. Returns the SQL and the tables it was shown.
+    """
+    from .orchestrator import get_llm
+
+    schema = await get_schema()
+    tables = select_tables(question, schema, settings.SQL_AGENT_MAX_TABLES)
+    prompt = SQL_PROMPT.format(
+        dialect=get_sql_engine().dialect.name,
+        tables=describe_tables(schema, tables),
+        question=question,
+    )
+    response = await with_deadline(get_llm().ainvoke([HumanMessage(content=prompt)]))
+    return extract_sql(response.content), tables
+
+async def run_sql_agent(question: str) -> Dict[str, Any]:
+    """
+    Answer a question by generating and running a read-only SQL query.
+
+    Repeated questions reuse their generated SQL, and queries that normalize
+    to the same text reuse their results until the cache TTL expires.
+    """
+    question_key = " ".join(question.lower().split())
+    cached_sql = _sql_cache.get(question_key)
+    if cached_sql is not None:
+        sql, tables = cached_sql
+    else:
+        sql, tables = await generate_sql(question)
+
+    source: Dict[str, Any] = {"type": "sql", "query": sql, "tables": tables}
+    try:
+        check_read_only(sql)
+        sql_key = normalize_sql(sql)
+        result: Optional[tuple] = _result_cache.get(sql_key)
+        source["cached"] = result is not None
+        if result is None:
+            result = await asyncio.to_thread(run_read_query, sql, settings.SQL_AGENT_MAX_ROWS)
+            _result_cache.set(sql_key, result)
+    except (ValueError, SQLAlchemyError) as e:
+        # Don't keep SQL that failed; the next attempt generates a new query
+        _sql_cache.pop(question_key)
+        return {"answer": f"The query could not be run: {e}\n\n```sql\n{sql}\n```", "sources": [source]}
+
+    _sql_cache.set(question_key, (sql, tables))
+    columns, rows, truncated = result
+    source["row_count"] = len(rows)
+    return {"answer": format_result(sql, columns, rows, truncated), "sources": [source]}
@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+
+from ...core.auth import get_current_user
+from ...models.user import User
+from ...services.snapshot_service import (
+    create_snapshot_job,
+    get_snapshot_job,
+    run_snapshot_job,
+)
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+class SnapshotExportRequest(BaseModel):
+    # Directory under SNAPSHOT_DIR
+    name: str = Field(pattern=r"^[A-Za-z0-9][A-Za-z0-9._-]*$", max_length=128)
+    shard_size: Optional[int] = Field(default=None, ge=1, le=100000)
+    # Start over instead of resuming an interrupted export
+    restart: bool = False
+
+class SnapshotImportRequest(BaseModel):
+    name: str = Field(pattern=r"^[A-Za-z0-9][A-Za-z0-9._-]*$", max_length=128)
+    batch_size: Optional[int] = Field(default=None, ge=1, le=10000)
+    # Drop and recreate the vector store collection before loading
+    recreate: bool = False
+    restart: bool = False
+
+class SnapshotJob(BaseModel):
+    job_id: str
+    kind: str
+    name: str
+    status: str
+    stage: Optional[str] = None
+    done: int = 0
+    total: int = 0
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+def _require_superuser(current_user: User) -> None:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+
+async def _start_job(kind: str, name: str, background_tasks: BackgroundTasks, **options) -> dict:
+    job = await create_snapshot_job(kind, name)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A job is already running for this snapshot",
+        )
+    background_tasks.add_task(run_snapshot_job, job, **options)
+    return job
+
+@router.post("/snapshots/export", response_model=SnapshotJob, status_code=status.HTTP_202_ACCEPTED)
+async def export_snapshot_endpoint(
+    request: SnapshotExportRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export the knowledge base (documents, chunk text and vectors) to a
+    snapshot in the background
+    """
+    _require_superuser(current_user)
+    return await _start_job(
+        "export",
+        request.name,
+        background_tasks,
+        shard_size=request.shard_size,
+        restart=request.restart,
+    )
+
+@router.post("/snapshots/import", response_model=SnapshotJob, status_code=status.HTTP_202_ACCEPTED)
+async def import_snapshot_endpoint(
+    request: SnapshotImportRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Load a snapshot into the knowledge base in the background, without
+    re-embedding
+    """
+    _require_superuser(current_user)
+    return await _start_job(
+        "import",
+        request.name,
+        background_tasks,
+        batch_size=request.batch_size,
+        recreate=request.recreate,
+        restart=request.restart,
+    )
+
+@router.get("/snapshots/jobs/{job_id}", response_model=SnapshotJob)
+async def get_snapshot_job_endpoint(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the progress of a snapshot export or import
+    """
+    _require_superuser(current_user)
+    job = await get_snapshot_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,21 +1,35 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 
 from ...core.auth import get_current_user
 from ...models.user import User
-from ...agent.orchestrator import run_agent, list_agent_templates
+from ...agent.orchestrator import UnsupportedSession, run_agent, list_agent_templates, end_session
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 class AgentRequest(BaseModel):
     prompt: str
     agent_type: str = "default"
     parameters: Dict[str, Any] = {}
+    # Continue a server-side conversation; only the new prompt needs to be sent
+    session_id: Optional[str] = Field(default=None, min_length=1, max_length=128)
+
+class AgentMetadata(BaseModel):
+    sources: List[Dict[str, Any]] = []
+    processing_time: float = 0
+    model: str = "unknown"
+    session_id: Optional[str] = None
 
 class AgentResponse(BaseModel):
     result: str
-    metadata: Dict[str, Any] = {}
+    metadata: AgentMetadata = AgentMetadata()
+
+class AgentTemplate(BaseModel):
+    id: str
+    name: str
+    description: str
 
 @router.post("/run", response_model=AgentResponse)
 async def run_agent_endpoint(
@@ -25,23 +39,42 @@ async def run_agent_endpoint(
     """
     Run an agent with the given prompt and parameters
     """
-    result = await run_agent(
-        user_id=str(current_user.id),
-        prompt=request.prompt,
-        agent_type=request.agent_type,
-        parameters=request.parameters
+    try:
+        result = await run_agent(
+            user_id=str(current_user.id),
+            prompt=request.prompt,
+            agent_type=request.agent_type,
+            parameters=request.parameters,
+            session_id=request.session_id
+        )
+    except UnsupportedSession as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return AgentResponse(
+        result=result.get("answer", ""),
+        metadata=AgentMetadata(
+            sources=result.get("sources", []),
+            processing_time=result.get("processing_time", 0),
+            model=result.get("model", "unknown"),
+            session_id=result.get("session_id"),
+        ),
     )
+
+@router.delete("/sessions/{session_id}")
+async def delete_session_endpoint(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Delete a conversation session and its history
+    """
+    deleted = await end_session(str(current_user.id), session_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
     
-    return {
-        "result": result.get("answer", ""),
-        "metadata": {
-            "sources": result.get("sources", []),
-            "processing_time": result.get("processing_time", 0),
-            "model": result.get("model", "unknown"),
-        }
-    }
-
-@router.get("/templates", response_model=List[Dict[str, Any]])
+    return {"message": "Session deleted successfully"}
+
+@router.get("/templates", response_model=List[AgentTemplate])
 async def get_agent_templates(
     current_user: User = Depends(get_current_user)
 ):
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from ...core.warmup import get_readiness
 from ...db.mongodb import get_database
 
 router = APIRouter()
@@ -10,6 +12,18 @@ async def health_check():
     """
     return {"status": "ok", "message": "Service is running"}
 
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint: fails until every connection pool has been warmed
+    up and indexes exist, and again while shutting down
+    """
+    readiness = get_readiness()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content={"status": "ready" if readiness["ready"] else "warming_up", "checks": readiness["checks"]},
+    )
+
 @router.get("/db")
 async def db_health_check():
     """
@@ -1,26 +1,98 @@
-from typing import Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Header, Request, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from ...core.auth import get_current_user
+from ...core.config import settings
 from ...models.user import User
 from ...services.knowledge_service import (
     upload_document, 
-    search_documents, 
+    complete_resumable_upload,
+    cached_search_documents, 
     get_document_by_id,
-    delete_document
+    update_document,
+    delete_document,
+    DocumentUpdatePending
 )
+from ...services.search_cache import get_cache_stats
+from ...services.upload_service import (
+    DuplicateDocument,
+    UploadOffsetMismatch,
+    UploadInProgress,
+    UploadTooLarge,
+    append_upload_chunk,
+    cancel_upload_session,
+    create_upload_session,
+    get_upload_session,
+)
+
+router = APIRouter(default_response_class=ORJSONResponse)
 
-router = APIRouter()
+class SearchFilters(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    tags: Optional[List[str]] = None
+    document_id: Optional[Union[str, List[str]]] = None
+    file_type: Optional[Union[str, List[str]]] = None
+    title: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
 
 class SearchRequest(BaseModel):
     query: str
-    filters: Dict[str, Any] = {}
+    filters: SearchFilters = SearchFilters()
     limit: int = 5
+    # Metadata keys to return per hit, plus "content" for the full chunk text.
+    # None returns everything.
+    fields: Optional[List[str]] = None
+    # Return a query-centered excerpt instead of the full chunk text
+    snippet: bool = False
+    snippet_length: int = Field(default=200, ge=20, le=2000)
+
+    @field_validator("fields")
+    def validate_fields(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        if v is not None:
+            for field in v:
+                if not field.isidentifier():
+                    raise ValueError(f"Invalid field name: {field!r}")
+        return v
+
+class ChunkMetadata(BaseModel):
+    # Loaders add their own keys (page, source...), which are passed through
+    model_config = ConfigDict(extra="allow")
+
+    document_id: Optional[str] = None
+    chunk_id: Optional[str] = None
+    title: Optional[str] = None
+    tags: Optional[List[str]] = None
+    file_type: Optional[str] = None
+    created_at_ts: Optional[float] = None
+    page: Optional[int] = None
+
+class SearchResult(BaseModel):
+    content: Optional[str] = None
+    snippet: Optional[str] = None
+    metadata: ChunkMetadata
+    score: float
+
+class SearchMetadata(BaseModel):
+    total: int
+    query: str
+    cache_hit: bool = False
+    cache_hit_ratio: float = 0.0
 
 class SearchResponse(BaseModel):
-    results: List[Dict[str, Any]]
-    metadata: Dict[str, Any] = {}
+    results: List[SearchResult]
+    metadata: SearchMetadata
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    title: str
+    description: Optional[str] = None
+    tags: List[str] = []
 
 @router.post("/upload")
 async def upload_document_endpoint(
@@ -34,21 +106,133 @@ async def upload_document_endpoint(
     """
     Upload a document to the knowledge base
     """
-    document_id = await upload_document(
-        file=file,
-        title=title,
-        description=description,
-        tags=tags,
-        user_id=str(current_user.id),
-        background_tasks=background_tasks
-    )
+    try:
+        document_id, duplicate = await upload_document(
+            file=file,
+            title=title,
+            description=description,
+            tags=tags,
+            user_id=str(current_user.id),
+            background_tasks=background_tasks
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    
+    return {
+        "message": "Document already uploaded" if duplicate else "Document uploaded successfully",
+        "document_id": document_id,
+        "duplicate": duplicate
+    }
+
+@router.post("/uploads", status_code=status.HTTP_201_CREATED)
+async def create_upload_session_endpoint(
+    request: UploadSessionRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Start a resumable upload. Send the file with PATCH /uploads/{upload_id}
+    in one or more chunks, each with an Upload-Offset header.
+    """
+    try:
+        session = await create_upload_session(
+            user_id=str(current_user.id),
+            filename=request.filename,
+            size=request.size,
+            title=request.title,
+            description=request.description,
+            tags=request.tags
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    
+    return {
+        "upload_id": session["upload_id"],
+        "offset": session["offset"],
+        "size": session["size"],
+        "chunk_size": settings.UPLOAD_CHUNK_SIZE
+    }
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_session_endpoint(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the offset a resumable upload should continue from
+    """
+    session = await get_upload_session(upload_id, str(current_user.id))
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return {"upload_id": upload_id, "offset": session["offset"], "size": session["size"]}
+
+@router.patch("/uploads/{upload_id}")
+async def append_upload_chunk_endpoint(
+    upload_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    upload_offset: int = Header(..., ge=0),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Append the request body to a resumable upload at Upload-Offset.
+    The document is queued for processing once the last byte arrives.
+    """
+    session = await get_upload_session(upload_id, str(current_user.id))
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    # Refuse oversized chunks before reading them
+    content_length = request.headers.get("content-length")
+    if content_length and not content_length.isdigit():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Content-Length header")
+    if content_length and int(content_length) > session["size"] - upload_offset:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Chunk runs past the declared upload size"
+        )
+    
+    try:
+        offset = await append_upload_chunk(session, upload_offset, request.stream())
+    except UploadOffsetMismatch as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Upload-Offset": str(e.offset)}
+        )
+    except UploadInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    
+    if offset < session["size"]:
+        return {"upload_id": upload_id, "offset": offset, "complete": False}
     
+    document_id, duplicate = await complete_resumable_upload(session, background_tasks)
     return {
-        "message": "Document uploaded successfully",
-        "document_id": document_id
+        "upload_id": upload_id,
+        "offset": offset,
+        "complete": True,
+        "document_id": document_id,
+        "duplicate": duplicate
     }
 
-@router.post("/search", response_model=SearchResponse)
+@router.delete("/uploads/{upload_id}")
+async def cancel_upload_session_endpoint(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Abort a resumable upload
+    """
+    session = await get_upload_session(upload_id, str(current_user.id))
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    await cancel_upload_session(session)
+    return {"message": "Upload cancelled"}
+
+@router.post("/search", response_model=SearchResponse, response_model_exclude_none=True)
 async def search_documents_endpoint(
     request: SearchRequest,
     current_user: User = Depends(get_current_user)
@@ -56,20 +240,24 @@ async def search_documents_endpoint(
     """
     Search documents in the knowledge base
     """
-    results = await search_documents(
+    results, cache_hit = await cached_search_documents(
         query=request.query,
-        filters=request.filters,
+        filters=request.filters.model_dump(exclude_none=True),
         limit=request.limit,
-        user_id=str(current_user.id)
+        user_id=str(current_user.id),
+        fields=request.fields,
+        snippet_length=request.snippet_length if request.snippet else None
     )
     
-    return {
-        "results": results,
-        "metadata": {
-            "total": len(results),
-            "query": request.query,
-        }
-    }
+    return SearchResponse(
+        results=results,
+        metadata=SearchMetadata(
+            total=len(results),
+            query=request.query,
+            cache_hit=cache_hit,
+            cache_hit_ratio=get_cache_stats()["hit_ratio"],
+        ),
+    )
 
 @router.get("/{document_id}")
 async def get_document(
@@ -85,6 +273,42 @@ async def get_document(
     
     return document
 
+@router.put("/{document_id}")
+async def update_document_endpoint(
+    document_id: str,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    description: Optional[str] = Form(None),
+    tags: List[str] = Form(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload a new version of a document. Only chunks whose content changed
+    are re-embedded; omitted fields keep their current values.
+    """
+    try:
+        result = await update_document(
+            document_id=document_id,
+            user_id=str(current_user.id),
+            file=file,
+            background_tasks=background_tasks,
+            title=title,
+            description=description,
+            tags=tags
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except (DuplicateDocument, DocumentUpdatePending) as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return {
+        "message": "Document unchanged" if result["unchanged"] else "Document update queued",
+        **result
+    }
+
 @router.delete("/{document_id}")
 async def delete_document_endpoint(
     document_id: str,
@@ -1,13 +1,15 @@
 from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 
 from ...core.auth import get_current_user
 from ...models.user import User
+from ...schemas.user import UserResponse
 from ...services.user_service import get_user_by_id, list_users, update_user
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-@router.get("/", response_model=List[Dict[str, Any]])
+@router.get("/", response_model=List[UserResponse])
 async def read_users(
     skip: int = 0, 
     limit: int = 100, 
@@ -22,19 +24,9 @@ async def read_users(
             detail="Not enough permissions",
         )
     users = await list_users(skip=skip, limit=limit)
-    return [
-        {
-            "id": str(user.id),
-            "email": user.email,
-            "name": user.name,
-            "is_active": user.is_active,
-            "is_superuser": user.is_superuser,
-            "created_at": user.created_at,
-        }
-        for user in users
-    ]
+    return [UserResponse.from_user(user) for user in users]
 
-@router.get("/{user_id}", response_model=Dict[str, Any])
+@router.get("/{user_id}", response_model=UserResponse)
 async def read_user(
     user_id: str, 
     current_user: User = Depends(get_current_user)
@@ -55,16 +47,9 @@ async def read_user(
             detail="User not found",
         )
     
-    return {
-        "id": str(user.id),
-        "email": user.email,
-        "name": user.name,
-        "is_active": user.is_active,
-        "is_superuser": user.is_superuser,
-        "created_at": user.created_at,
-    }
+    return UserResponse.from_user(user)
 
-@router.patch("/{user_id}", response_model=Dict[str, Any])
+@router.patch("/{user_id}", response_model=UserResponse)
 async def update_user_endpoint(
     user_id: str,
     user_data: Dict[str, Any],
@@ -91,12 +76,4 @@ async def update_user_endpoint(
             detail="User not found",
         )
     
-    return {
-        "id": str(user.id),
-        "email": user.email,
-        "name": user.name,
-        "is_active": user.is_active,
-        "is_superuser": user.is_superuser,
-        "created_at": user.created_at,
-        "updated_at": user.updated_at,
-    } 
\ No newline at end of file
+    return UserResponse.from_user(user) 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from .endpoints import users, agents, knowledge, health
+from .endpoints import users, agents, knowledge, health, admin
 
 api_router = APIRouter()
 
@@ -8,4 +8,5 @@ api_router = APIRouter()
 api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(agents.router, prefix="/agents", tags=["agents"])
-api_router.include_router(knowledge.router, prefix="/knowledge", tags=["knowledge"]) 
\ No newline at end of file
+api_router.include_router(knowledge.router, prefix="/knowledge", tags=["knowledge"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"]) 
\ No newline at end of file
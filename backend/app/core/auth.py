@@ -5,7 +5,6 @@ import jwt
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt import PyJWTError
-from msal import ConfidentialClientApplication
 
 from .config import settings
 from ..models.user import User
@@ -24,7 +23,10 @@ def create_access_token(*, data: dict, expires_delta: Optional[timedelta] = None
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
-def get_msal_app() -> ConfidentialClientApplication:
+def get_msal_app():
+    # Imported lazily: MSAL is only needed when a user logs in
+    from msal import ConfidentialClientApplication
+    
     return ConfidentialClientApplication(
         client_id=settings.AZURE_AD_CLIENT_ID,
         client_credential=settings.AZURE_AD_CLIENT_SECRET,
@@ -6,6 +6,43 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "AI Platform"
+
+    # Import LangChain, Qdrant, MSAL etc. during startup instead of on first use
+    PRELOAD_HEAVY_MODULES: bool = False
+    
+    # Startup warmup: connection pools are opened in the background and
+    # /health/ready fails until every step has succeeded
+    WARMUP_TIMEOUT_SECONDS: int = 10
+    WARMUP_RETRY_SECONDS: int = 5
+    # Warm the LLM and embeddings connections with a one-token request
+    WARMUP_LLM: bool = True
+    
+    # Load shedding per route group. A group's routes are an optional HTTP
+    # method and a path regex under API_V1_STR. At most "limit" of its
+    # requests run at once and up to "queue" more wait; beyond that they get
+    # a 503 with Retry-After. "deadline_seconds" bounds the request up to
+    # its response, including its Mongo, vector store and LLM calls; its
+    # background tasks are not bound by it, document ingestion being limited
+    # by INGESTION_CONCURRENCY instead. Other routes are never limited.
+    LOAD_SHEDDING_ENABLED: bool = True
+    ROUTE_GROUPS: Dict[str, Dict[str, Any]] = {
+        "agents": {
+            "routes": ["POST /agents/run$"],
+            "limit": 8, "queue": 16, "deadline_seconds": 60,
+        },
+        "uploads": {
+            "routes": ["POST /knowledge/upload$", "PATCH /knowledge/uploads/", "PUT /knowledge/[^/]+$"],
+            "limit": 4, "queue": 8, "deadline_seconds": 120,
+        },
+        "search": {
+            "routes": ["POST /knowledge/search$"],
+            "limit": 32, "queue": 64, "deadline_seconds": 15,
+        },
+        "admin": {
+            "routes": ["/admin/"],
+            "limit": 2, "queue": 2, "deadline_seconds": 30,
+        },
+    }
     
     # CORS
     CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -21,16 +58,59 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URI: str
     MONGODB_DB_NAME: str = "ai_platform"
+    # Connections the driver keeps open even when idle
+    MONGODB_MIN_POOL_SIZE: int = 2
     
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: str = ""
-    
+    # Redis is only a cache; give up quickly when it doesn't answer
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = 0.5
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 0.5
+
+    # Search result cache
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_TTL_SECONDS: int = 600
+    SEARCH_CACHE_NEAR_TTL_SECONDS: int = 30
+    SEARCH_CACHE_NEAR_MAX_ENTRIES: int = 1024
+    # How long a user's corpus generation is reused without asking Redis.
+    # Writes on other replicas show up in results after at most this long.
+    SEARCH_CACHE_GENERATION_TTL_SECONDS: float = 1.0
+
     # Vector Database
     VECTOR_DB_TYPE: str = "qdrant"  # qdrant, pinecone, etc.
     VECTOR_DB_URL: str = "http://localhost:6333"
     VECTOR_DB_API_KEY: str = ""
+    # Where chunk text is kept: "inline" in the vector payload, or "mongo" /
+    # "file" for a compressed side store, leaving only IDs and filterable
+    # keys in the payload
+    CHUNK_STORE: str = "inline"
+    CHUNK_STORE_PATH: str = "/tmp/ai_platform_chunks.db"
+    
+    # Knowledge base snapshots, exported and imported without re-embedding
+    SNAPSHOT_DIR: str = "/tmp/ai_platform_snapshots"
+    SNAPSHOT_SHARD_SIZE: int = 2048
+    SNAPSHOT_UPSERT_BATCH_SIZE: int = 256
+    # How long finished export/import jobs can still be looked up
+    SNAPSHOT_JOB_TTL_SECONDS: int = 24 * 3600
+    
+    # Uploads
+    UPLOAD_TEMP_DIR: str = "/tmp/ai_platform_uploads"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    # Total document storage per user, 0 for unlimited
+    UPLOAD_USER_QUOTA_BYTES: int = 0
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+    # How often spool files of expired upload sessions are swept away
+    UPLOAD_SWEEP_INTERVAL_SECONDS: int = 3600
+    # Documents each process embeds and indexes at once after their upload
+    # or update has been answered; the rest wait for a slot
+    INGESTION_CONCURRENCY: int = 2
+    
+    # Chunking: per file type overrides of the splitter profiles, e.g.
+    # {"pdf": {"chunk_tokens": 512}}
+    CHUNKING_PROFILES: Dict[str, Dict[str, int]] = {}
     
     # Azure AD Auth
     AZURE_AD_TENANT_ID: str
@@ -43,6 +123,27 @@ class Settings(BaseSettings):
     AZURE_OPENAI_API_VERSION: str = "2023-05-15"
     AZURE_OPENAI_DEPLOYMENT_NAME: str
     
+    # Agent conversation sessions
+    AGENT_SESSION_TTL_SECONDS: int = 7 * 24 * 3600
+    # Token budget for the history sent with each turn; older turns are
+    # folded into a rolling summary once it is exceeded
+    AGENT_SESSION_MAX_HISTORY_TOKENS: int = 2000
+    AGENT_SESSION_KEEP_MESSAGES: int = 4
+    
+    # SQL agent: the database it queries, e.g. sqlite:///./analytics.db.
+    # Queries run in read-only transactions, but connect as a role with only
+    # SELECT grants as well.
+    SQL_AGENT_DATABASE_URL: str = ""
+    SQL_AGENT_POOL_SIZE: int = 5
+    SQL_AGENT_MAX_OVERFLOW: int = 5
+    SQL_AGENT_STATEMENT_TIMEOUT_SECONDS: int = 15
+    SQL_AGENT_MAX_ROWS: int = 200
+    # Tables described in the prompt, picked by relevance to the question
+    SQL_AGENT_MAX_TABLES: int = 6
+    SQL_AGENT_SCHEMA_TTL_SECONDS: int = 3600
+    SQL_AGENT_RESULT_CACHE_TTL_SECONDS: int = 300
+    SQL_AGENT_RESULT_CACHE_MAX_ENTRIES: int = 256
+    
     # JWT
     SECRET_KEY: str = "CHANGE_ME_IN_PRODUCTION"
     JWT_ALGORITHM: str = "HS256"
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Deadline:
+    """
+    Monotonic time by which a request must finish. Cleared once the
+    response is sent, so work the request leaves running afterwards (its
+    background tasks) isn't bound by it.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at: Optional[float] = time.monotonic() + seconds
+
+    def clear(self) -> None:
+        self.expires_at = None
+
+# Deadline of the current request, if it has one
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+def set_deadline(seconds: float):
+    """
+    Give the current request ``seconds`` to finish.
+    Returns a token for ``reset_deadline``.
+    """
+    return _deadline.set(Deadline(seconds))
+
+def get_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+def reset_deadline(token) -> None:
+    _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """
+    Get the seconds left before the request deadline, or None without one.
+    Raises asyncio.TimeoutError once the deadline has passed.
+    """
+    deadline = _deadline.get()
+    if deadline is None or deadline.expires_at is None:
+        return None
+    remaining = deadline.expires_at - time.monotonic()
+    if remaining <= 0:
+        raise asyncio.TimeoutError("Request deadline exceeded")
+    return remaining
+
+async def with_deadline(awaitable: Awaitable[T]) -> T:
+    """
+    Await a downstream call, cancelling it if the request deadline passes first
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout=remaining)
@@ -0,0 +1,74 @@
+import importlib
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Heavy third-party modules that are imported on first use of their subsystem
+HEAVY_MODULES = {
+    "knowledge": [
+        "langchain.text_splitter",
+        "langchain_community.document_loaders",
+        "langchain_community.vectorstores",
+        "langchain_openai",
+        "qdrant_client",
+    ],
+    "agents": [
+        "langchain.prompts",
+        "langchain.schema",
+        "langchain_openai",
+        "langgraph.graph",
+        "sqlalchemy",
+        "tiktoken",
+    ],
+    "auth": [
+        "msal",
+    ],
+}
+
+def preload_heavy_modules() -> Dict[str, float]:
+    """
+    Import every heavy module up front, returning the time each took in ms
+    """
+    timings = {}
+    for modules in HEAVY_MODULES.values():
+        for name in modules:
+            if name in timings:
+                continue
+            start = time.perf_counter()
+            importlib.import_module(name)
+            timings[name] = (time.perf_counter() - start) * 1000
+    return timings
+
+def import_time_report(target: str = "app.main") -> List[Tuple[str, float, float]]:
+    """
+    Measure a cold import of ``target`` in a fresh interpreter.
+
+    Returns ``(module, self_ms, cumulative_ms)`` tuples sorted by cumulative
+    time, as reported by ``python -X importtime``.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{completed.stderr}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows
+
+def print_import_time_report(target: str = "app.main", top: int = 30) -> None:
+    """
+    Print the slowest modules of a cold import of ``target``
+    """
+    rows = import_time_report(target)
+    print(f"{'cumulative ms':>14} {'self ms':>10}  module")
+    for name, self_ms, cumulative_ms in rows[:top]:
+        print(f"{cumulative_ms:>14.1f} {self_ms:>10.1f}  {name}")
@@ -0,0 +1,221 @@
+import asyncio
+import contextlib
+import logging
+import math
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from .deadlines import get_deadline, remaining_time, reset_deadline, set_deadline
+
+logger = logging.getLogger(__name__)
+
+class RouteGroup:
+    """
+    Concurrency limit, wait queue and deadline shared by a group of routes
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, deadline_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.deadline_seconds = deadline_seconds
+        self.active = 0
+        self.waiting = 0
+        # Moving average of how long a request holds its slot
+        self.average_seconds = 1.0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def retry_after(self) -> int:
+        """
+        Estimate how long until a slot frees up for a new request
+        """
+        estimate = self.average_seconds * (self.waiting + 1) / self.limit
+        return max(1, min(math.ceil(estimate), math.ceil(self.deadline_seconds)))
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, waiting in the queue within the request deadline.
+        Returns False if the queue is full or the wait timed out.
+        """
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self.active += 1
+            return True
+        if self.waiting >= self.queue:
+            return False
+
+        self.waiting += 1
+        waiter = asyncio.ensure_future(self._semaphore.acquire())
+        acquired = False
+        try:
+            await asyncio.wait({waiter}, timeout=_wait_timeout())
+        finally:
+            self.waiting -= 1
+            acquired = waiter.done() and not waiter.cancelled()
+            if not acquired:
+                # Give up the wait; a slot granted meanwhile goes straight back
+                waiter.cancel()
+                waiter.add_done_callback(self._release_if_acquired)
+        if acquired:
+            self.active += 1
+        return acquired
+
+    def _release_if_acquired(self, waiter: asyncio.Future) -> None:
+        if not waiter.cancelled():
+            self._semaphore.release()
+
+    def release(self, seconds: float) -> None:
+        self.active -= 1
+        self.average_seconds = 0.8 * self.average_seconds + 0.2 * seconds
+        self._semaphore.release()
+
+def _wait_timeout() -> Optional[float]:
+    try:
+        return remaining_time()
+    except asyncio.TimeoutError:
+        return 0
+
+def build_route_groups(config: Dict[str, Dict[str, Any]], prefix: str = "") -> List[Tuple[Optional[str], re.Pattern, RouteGroup]]:
+    """
+    Compile the route group settings into ``(method, path pattern, group)``
+    rules. A route is an optional HTTP method followed by a path regex
+    relative to ``prefix``, matched from the start of the path.
+    """
+    rules = []
+    for name, options in config.items():
+        group = RouteGroup(
+            name,
+            limit=options["limit"],
+            queue=options.get("queue", 0),
+            deadline_seconds=options["deadline_seconds"],
+        )
+        for route in options["routes"]:
+            method, _, path = route.rpartition(" ")
+            rules.append((method.upper() or None, re.compile(re.escape(prefix) + path), group))
+    return rules
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware that caps concurrent requests per route group.
+
+    Requests beyond a group's limit wait in its queue; once the queue is
+    full they are rejected straight away with 503 and Retry-After, so a
+    burst of expensive requests can't tie up the workers. Each request gets
+    its group's deadline, which bounds the time spent queueing, the Mongo
+    operations (through pymongo's timeout context) and the vector store and
+    LLM calls made through ``with_deadline``. Past it, the handler is
+    cancelled and a 504 returned. Routes outside every group pass straight
+    through.
+
+    Starlette runs a route's background tasks in the same call, after the
+    response is sent. The slot and the deadline end with the response, so
+    that work neither holds up the queue nor gets cut off.
+    """
+
+    def __init__(self, app, groups: Dict[str, Dict[str, Any]], prefix: str = ""):
+        self.app = app
+        self.rules = build_route_groups(groups, prefix)
+
+    def match(self, method: str, path: str) -> Optional[RouteGroup]:
+        for rule_method, pattern, group in self.rules:
+            if (rule_method is None or rule_method == method) and pattern.match(path):
+                return group
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        group = self.match(scope["method"], scope["path"])
+        if group is None:
+            return await self.app(scope, receive, send)
+
+        token = set_deadline(group.deadline_seconds)
+        try:
+            if not await group.acquire():
+                logger.warning("Shedding %s %s: %s group is full", scope["method"], scope["path"], group.name)
+                return await _respond(send, 503, "Server is busy, try again later", {
+                    "retry-after": str(group.retry_after()),
+                })
+            start = time.monotonic()
+            released = False
+
+            def _release() -> None:
+                nonlocal released
+                if not released:
+                    released = True
+                    group.release(time.monotonic() - start)
+
+            try:
+                await self._call_with_deadline(group, scope, receive, send, _release)
+            finally:
+                _release()
+        finally:
+            reset_deadline(token)
+
+    async def _call_with_deadline(self, group: RouteGroup, scope, receive, send, release):
+        import pymongo
+        from pymongo.errors import PyMongoError
+
+        deadline = get_deadline()
+        remaining = remaining_time()
+        started = False
+        response_sent = asyncio.Event()
+        # Scope of the Mongo timeout, which can end before the app returns
+        mongo_timeout = contextlib.ExitStack()
+
+        async def _send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # What runs after this is background work: lift the deadline,
+                # end the Mongo timeout (the app sends from the task _run
+                # entered it in) and hand the slot back
+                deadline.clear()
+                mongo_timeout.close()
+                release()
+                response_sent.set()
+
+        async def _run():
+            with mongo_timeout:
+                mongo_timeout.enter_context(pymongo.timeout(remaining))
+                await self.app(scope, receive, _send)
+
+        task = asyncio.ensure_future(_run())
+        sent = asyncio.ensure_future(response_sent.wait())
+        timed_out = False
+        try:
+            await asyncio.wait({task, sent}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not task.done() and not response_sent.is_set():
+                timed_out = True
+                task.cancel()
+            # Past the response this waits for background tasks, unbounded
+            await task
+        except asyncio.CancelledError:
+            if not timed_out:
+                # Cancelled from outside, not by the deadline
+                task.cancel()
+                raise
+        except (asyncio.TimeoutError, PyMongoError) as e:
+            # Raised by a downstream call that ran out of time
+            if (isinstance(e, PyMongoError) and not e.timeout) or response_sent.is_set():
+                raise
+            timed_out = True
+        finally:
+            sent.cancel()
+
+        if timed_out:
+            logger.warning("%s %s exceeded its %ss deadline", scope["method"], scope["path"], group.deadline_seconds)
+            if not started:
+                await _respond(send, 504, "Request deadline exceeded")
+
+async def _respond(send, status: int, detail: str, headers: Dict[str, str] = {}) -> None:
+    body = orjson.dumps({"detail": detail})
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(k.encode(), v.encode()) for k, v in headers.items()]
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
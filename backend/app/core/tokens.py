@@ -0,0 +1,42 @@
+import logging
+from functools import lru_cache
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Encoding used by the GPT-3.5/GPT-4 family deployed on Azure OpenAI
+ENCODING_NAME = "cl100k_base"
+
+# Rough characters-per-token ratio for English text, used when the encoding
+# can't be loaded (tiktoken downloads it on first use)
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """
+    Get the tiktoken encoding, loading it on first use.
+    Returns None if it is unavailable.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        logger.warning("Could not load %s encoding, estimating token counts: %s", ENCODING_NAME, e)
+        return None
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a piece of text
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """
+    Approximate the prompt tokens used by chat messages, including the
+    few tokens of per-message overhead the chat format adds
+    """
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
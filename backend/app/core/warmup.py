@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Outcome of each warmup step, reported by /health/ready
+_checks: Dict[str, Dict[str, Any]] = {}
+_ready = False
+
+async def _warm_mongo() -> None:
+    from ..db.mongodb import get_database, init_db
+
+    db = await get_database()
+    await db.command("ping")
+    await init_db()
+
+async def _warm_redis() -> None:
+    from ..db.redis import get_redis
+
+    redis = await get_redis()
+    await redis.ping()
+
+async def _warm_vector_store() -> None:
+    from ..services.knowledge_service import get_qdrant_client
+
+    await asyncio.to_thread(get_qdrant_client().get_collections)
+
+async def _warm_llm() -> None:
+    from ..agent.orchestrator import get_llm
+    from ..services.knowledge_service import get_embeddings
+
+    # One token each is enough to open the connections and check credentials
+    await asyncio.gather(
+        get_embeddings().aembed_query("ping"),
+        get_llm().ainvoke("ping", max_tokens=1),
+    )
+
+def get_warmup_steps() -> Dict[str, Callable[[], Awaitable[None]]]:
+    steps = {
+        "mongo": _warm_mongo,
+        "redis": _warm_redis,
+        "vector_store": _warm_vector_store,
+    }
+    if settings.WARMUP_LLM:
+        steps["llm"] = _warm_llm
+    return steps
+
+async def _run_step(name: str, step: Callable[[], Awaitable[None]]) -> bool:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(step(), timeout=settings.WARMUP_TIMEOUT_SECONDS)
+    except Exception as e:
+        _checks[name] = {"status": "error", "error": str(e) or type(e).__name__}
+        logger.warning("Warmup of %s failed: %s", name, _checks[name]["error"])
+        return False
+    _checks[name] = {"status": "ok", "ms": round((time.perf_counter() - start) * 1000, 1)}
+    return True
+
+async def warm_up() -> None:
+    """
+    Open and warm every connection pool, retrying failed steps until all
+    succeed, then mark the process ready. Steps that succeeded (including
+    index creation) are not repeated.
+    """
+    global _ready
+    pending = get_warmup_steps()
+    for name in pending:
+        _checks[name] = {"status": "pending"}
+    while True:
+        results = await asyncio.gather(*(_run_step(name, step) for name, step in pending.items()))
+        pending = {name: step for (name, step), ok in zip(pending.items(), results) if not ok}
+        if not pending:
+            break
+        await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+    _ready = True
+    logger.info("Warmup complete: %s", _checks)
+
+def is_ready() -> bool:
+    return _ready
+
+def set_not_ready() -> None:
+    """
+    Fail readiness, e.g. while shutting down so no new traffic is routed here
+    """
+    global _ready
+    _ready = False
+
+def get_readiness() -> Dict[str, Any]:
+    return {"ready": _ready, "checks": dict(_checks)}
@@ -10,7 +10,10 @@ async def get_database():
     """
     global _client, _db
     if _db is None:
-        _client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URI)
+        _client = motor.motor_asyncio.AsyncIOMotorClient(
+            settings.MONGODB_URI,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        )
         _db = _client[settings.MONGODB_DB_NAME]
     return _db
 
@@ -18,9 +21,11 @@ async def close_mongo_connection():
     """
     Close MongoDB connection
     """
-    global _client
+    global _client, _db
     if _client is not None:
         _client.close()
+        _client = None
+        _db = None
 
 async def init_db():
     """
@@ -30,5 +35,35 @@ async def init_db():
     
     # Create indexes
     await db.users.create_index("email", unique=True)
+    await db.documents.create_index("document_id", unique=True)
+    # One document per user and content; the record is written as soon as an
+    # upload is queued, so re-sending a file that is still processing is
+    # caught too. Older deployments have a non-unique index on these keys.
+    indexes = await db.documents.index_information()
+    if not indexes.get("user_id_1_content_hash_1", {"unique": True}).get("unique"):
+        await db.documents.drop_index("user_id_1_content_hash_1")
+    await db.documents.create_index(
+        [("user_id", 1), ("content_hash", 1)],
+        unique=True,
+        partialFilterExpression={"content_hash": {"$type": "string"}},
+    )
+    # Documents indexed before versioning are version 1
+    await db.documents.update_many({"version": {"$exists": False}}, {"$set": {"version": 1}})
+    await db.chunks.create_index("chunk_id", unique=True)
+    await db.chunks.create_index("document_id")
+    await db.upload_sessions.create_index("upload_id", unique=True)
+    # Abandoned resumable uploads expire with the session TTL
+    await db.upload_sessions.create_index(
+        "updated_at", expireAfterSeconds=settings.UPLOAD_SESSION_TTL_SECONDS
+    )
+    
+    await db.snapshot_jobs.create_index("job_id", unique=True)
+    # At most one running job per snapshot directory, across replicas
+    await db.snapshot_jobs.create_index(
+        "name", unique=True, partialFilterExpression={"status": "running"}
+    )
+    await db.snapshot_jobs.create_index(
+        "finished_at", expireAfterSeconds=settings.SNAPSHOT_JOB_TTL_SECONDS
+    )
     
     # Add more initialization as needed 
\ No newline at end of file
@@ -0,0 +1,28 @@
+import redis.asyncio as aioredis
+from ..core.config import settings
+
+_client = None
+
+async def get_redis():
+    """
+    Get Redis client instance
+    """
+    global _client
+    if _client is None:
+        _client = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD or None,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        )
+    return _client
+
+async def close_redis_connection():
+    """
+    Close Redis connection
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,119 @@
+import time
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
+
+from ..core.config import settings
+from ..core.deadlines import remaining_time
+
+_engine = None
+
+# SQLite has no statement timeout, so running queries are checked against
+# their deadline every this many virtual machine instructions
+SQLITE_PROGRESS_INTERVAL = 10000
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """
+    Dialect-specific options making every pooled connection read-only with
+    a statement timeout. These are only session defaults, which a query could
+    change; run_read_query also makes each transaction read-only.
+    """
+    timeout_ms = settings.SQL_AGENT_STATEMENT_TIMEOUT_SECONDS * 1000
+    options: Dict[str, Any] = {"pool_pre_ping": True}
+    if url.startswith("sqlite"):
+        return options
+
+    options.update(pool_size=settings.SQL_AGENT_POOL_SIZE, max_overflow=settings.SQL_AGENT_MAX_OVERFLOW)
+    if url.startswith("postgresql"):
+        options["connect_args"] = {
+            "options": f"-c default_transaction_read_only=on -c statement_timeout={timeout_ms}"
+        }
+    elif url.startswith("mysql"):
+        options["connect_args"] = {
+            "init_command": f"SET SESSION transaction_read_only = 1, max_execution_time = {timeout_ms}"
+        }
+    return options
+
+def _configure_sqlite(engine: Engine) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA query_only = ON")
+
+        def _past_deadline() -> int:
+            deadline = connection_record.info.get("deadline")
+            return int(deadline is not None and time.monotonic() > deadline)
+
+        # A non-zero return interrupts the running statement
+        dbapi_connection.set_progress_handler(_past_deadline, SQLITE_PROGRESS_INTERVAL)
+
+def get_sql_engine() -> Engine:
+    """
+    Get the pooled, read-only engine for the SQL agent's database
+    """
+    global _engine
+    if _engine is None:
+        url = settings.SQL_AGENT_DATABASE_URL
+        if not url:
+            raise RuntimeError("SQL_AGENT_DATABASE_URL is not configured")
+        _engine = create_engine(url, **_engine_options(url))
+        if _engine.dialect.name == "sqlite":
+            _configure_sqlite(_engine)
+    return _engine
+
+def inspect_schema() -> Dict[str, Dict[str, Any]]:
+    """
+    Read the tables of the database with their columns and the tables their
+    foreign keys refer to
+    """
+    inspector = inspect(get_sql_engine())
+    schema = {}
+    for table in inspector.get_table_names():
+        foreign_keys = inspector.get_foreign_keys(table)
+        references = {}
+        for fk in foreign_keys:
+            for column, referred in zip(fk["constrained_columns"], fk["referred_columns"]):
+                references[column] = f"{fk['referred_table']}.{referred}"
+        schema[table] = {
+            "columns": [(c["name"], str(c["type"])) for c in inspector.get_columns(table)],
+            "references": references,
+        }
+    return schema
+
+def run_read_query(sql: str, max_rows: int) -> Tuple[List[str], List[tuple], bool]:
+    """
+    Run a query within the statement timeout (or what is left of the
+    request deadline, if shorter) and return its column names, at most
+    ``max_rows`` rows and whether more rows were available
+    """
+    timeout = settings.SQL_AGENT_STATEMENT_TIMEOUT_SECONDS
+    remaining = remaining_time()
+    if remaining is not None:
+        timeout = min(timeout, remaining)
+    
+    with get_sql_engine().connect() as conn:
+        conn.info["deadline"] = time.monotonic() + timeout
+        # Read-only for this transaction whatever the session defaults have
+        # been changed to; it has to come before any other statement
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(timeout * 1000), 1)}")
+        elif conn.dialect.name == "mysql":
+            conn.exec_driver_sql(f"SET SESSION max_execution_time = {max(int(timeout * 1000), 1)}")
+            conn.exec_driver_sql("START TRANSACTION READ ONLY")
+        try:
+            result = conn.exec_driver_sql(sql)
+            columns = list(result.keys())
+            rows = [tuple(row) for row in result.fetchmany(max_rows + 1)]
+        finally:
+            conn.info.pop("deadline", None)
+    return columns, rows[:max_rows], len(rows) > max_rows
+
+def close_sql_engine():
+    """
+    Close the SQL agent's connection pool
+    """
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
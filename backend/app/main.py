@@ -1,9 +1,44 @@
+import asyncio
+import logging
 import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routers import api_router
 from .core.config import settings
 from .core.auth import get_auth_router
+from .core.lazy_imports import preload_heavy_modules
+from .core.load_shedding import LoadSheddingMiddleware
+from .core.warmup import set_not_ready, warm_up
+from .db.mongodb import close_mongo_connection
+from .db.redis import close_redis_connection
+from .services.knowledge_service import close_qdrant_client
+from .services.upload_service import run_upload_sweeper
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.PRELOAD_HEAVY_MODULES:
+        timings = await asyncio.to_thread(preload_heavy_modules)
+        logger.info("Preloaded heavy modules in %.0f ms", sum(timings.values()))
+    
+    # Warm up in the background so liveness is answered meanwhile;
+    # /health/ready fails until it is done
+    warmup_task = asyncio.create_task(warm_up())
+    sweeper_task = asyncio.create_task(run_upload_sweeper())
+    yield
+    
+    set_not_ready()
+    warmup_task.cancel()
+    sweeper_task.cancel()
+    await asyncio.gather(warmup_task, sweeper_task, return_exceptions=True)
+    await close_mongo_connection()
+    await close_redis_connection()
+    close_qdrant_client()
+    if settings.SQL_AGENT_DATABASE_URL:
+        from .db.sql import close_sql_engine
+        close_sql_engine()
 
 # Create FastAPI app
 app = FastAPI(
@@ -11,8 +46,18 @@ app = FastAPI(
     description="AI Platform API",
     version="1.0.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
+# Cap expensive route groups so they can't starve cheap routes; added
+# before CORS so shed responses still carry CORS headers
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        groups=settings.ROUTE_GROUPS,
+        prefix=settings.API_V1_STR,
+    )
+
 # Set up CORS
 app.add_middleware(
     CORSMiddleware,
@@ -45,5 +90,20 @@ async def root():
     }
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run the AI Platform API")
+    parser.add_argument(
+        "--import-report",
+        action="store_true",
+        help="print per-module import times (ms) of a cold start and exit",
+    )
+    parser.add_argument("--top", type=int, default=30, help="modules to show in the import report")
+    args = parser.parse_args()
+    
+    if args.import_report:
+        from .core.lazy_imports import print_import_time_report
+        print_import_time_report("app.main", top=args.top)
+    else:
+        import uvicorn
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
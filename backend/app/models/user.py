@@ -1,12 +1,24 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic_core import core_schema
 from bson import ObjectId
 
 class PyObjectId(str):
+    """
+    ObjectId stored as its hex string, so models serialize without custom encoders
+    """
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.to_string_ser_schema(),
+        )
+
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_json_schema__(cls, schema: core_schema.CoreSchema, handler) -> dict:
+        return {"type": "string"}
 
     @classmethod
     def validate(cls, v):
@@ -15,17 +27,12 @@ class PyObjectId(str):
         return str(v)
 
 class User(BaseModel):
-    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: Optional[PyObjectId] = Field(default_factory=lambda: str(ObjectId()), alias="_id")
     email: str
     name: Optional[str] = None
     is_active: bool = True
     is_superuser: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: Optional[datetime] = None
-
-    class Config:
-        allow_population_by_field_name = True
-        json_encoders = {
-            ObjectId: lambda oid: str(oid),
-            datetime: lambda dt: dt.isoformat(),
-        } 
\ No newline at end of file
+    updated_at: Optional[datetime] = None 
\ No newline at end of file
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, List, Tuple
+
+from ..core.config import settings
+from ..db.mongodb import get_database
+from .vector_filters import FILTERABLE_FIELDS
+
+# Metadata kept in the vector payload when chunk text lives in a chunk
+# store: what search filters on, plus the key to hydrate the rest with
+PAYLOAD_FIELDS = set(FILTERABLE_FIELDS) | {"chunk_id"}
+
+_chunk_store = None
+
+def split_metadata(metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split chunk metadata into the slim vector payload and the remainder
+    kept in the chunk store
+    """
+    payload = {k: v for k, v in metadata.items() if k in PAYLOAD_FIELDS}
+    rest = {k: v for k, v in metadata.items() if k not in PAYLOAD_FIELDS}
+    return payload, rest
+
+def _pack(text: str, metadata: Dict[str, Any]) -> bytes:
+    data = json.dumps({"text": text, "metadata": metadata}, separators=(",", ":"))
+    return zlib.compress(data.encode("utf-8"))
+
+def _unpack(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data))
+
+class MongoChunkStore:
+    """
+    Chunk store backed by the ``chunks`` collection
+    """
+
+    async def put_chunks(self, document_id: str, chunks: List[Dict[str, Any]]) -> None:
+        from pymongo import ReplaceOne
+
+        if not chunks:
+            return
+        db = await get_database()
+        await db.chunks.bulk_write([
+            ReplaceOne(
+                {"chunk_id": chunk["chunk_id"]},
+                {
+                    "chunk_id": chunk["chunk_id"],
+                    "document_id": document_id,
+                    "data": _pack(chunk["text"], chunk["metadata"]),
+                },
+                upsert=True,
+            )
+            for chunk in chunks
+        ], ordered=False)
+
+    async def get_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not chunk_ids:
+            return {}
+        db = await get_database()
+        cursor = db.chunks.find({"chunk_id": {"$in": list(chunk_ids)}}, {"_id": 0, "document_id": 0})
+        return {row["chunk_id"]: _unpack(row["data"]) async for row in cursor}
+
+    async def delete_chunks(self, chunk_ids: List[str]) -> None:
+        if not chunk_ids:
+            return
+        db = await get_database()
+        await db.chunks.delete_many({"chunk_id": {"$in": list(chunk_ids)}})
+
+    async def delete_document(self, document_id: str) -> None:
+        db = await get_database()
+        await db.chunks.delete_many({"document_id": document_id})
+
+class FileChunkStore:
+    """
+    Chunk store backed by a local SQLite file, for single-node deployments.
+    Queries run in a worker thread so the event loop is never blocked.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks "
+                "(chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, data BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_document_id ON chunks (document_id)")
+            self._conn.commit()
+
+    def _execute(self, sql: str, params=(), many: bool = False) -> list:
+        with self._lock:
+            if many:
+                self._conn.executemany(sql, params)
+                rows = []
+            else:
+                rows = self._conn.execute(sql, params).fetchall()
+            self._conn.commit()
+            return rows
+
+    async def put_chunks(self, document_id: str, chunks: List[Dict[str, Any]]) -> None:
+        rows = [
+            (chunk["chunk_id"], document_id, _pack(chunk["text"], chunk["metadata"]))
+            for chunk in chunks
+        ]
+        if rows:
+            await asyncio.to_thread(
+                self._execute, "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", rows, True
+            )
+
+    async def get_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not chunk_ids:
+            return {}
+        placeholders = ",".join("?" * len(chunk_ids))
+        rows = await asyncio.to_thread(
+            self._execute,
+            f"SELECT chunk_id, data FROM chunks WHERE chunk_id IN ({placeholders})",
+            list(chunk_ids),
+        )
+        return {chunk_id: _unpack(data) for chunk_id, data in rows}
+
+    async def delete_chunks(self, chunk_ids: List[str]) -> None:
+        if chunk_ids:
+            await asyncio.to_thread(
+                self._execute, "DELETE FROM chunks WHERE chunk_id = ?", [(c,) for c in chunk_ids], True
+            )
+
+    async def delete_document(self, document_id: str) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM chunks WHERE document_id = ?", (document_id,))
+
+def get_chunk_store():
+    """
+    Get the configured chunk store, or None if chunk text is kept inline in
+    the vector payload
+    """
+    global _chunk_store
+    if settings.CHUNK_STORE == "inline":
+        return None
+    if _chunk_store is None:
+        if settings.CHUNK_STORE == "mongo":
+            _chunk_store = MongoChunkStore()
+        elif settings.CHUNK_STORE == "file":
+            _chunk_store = FileChunkStore(settings.CHUNK_STORE_PATH)
+        else:
+            raise ValueError(f"Unknown CHUNK_STORE: {settings.CHUNK_STORE}")
+    return _chunk_store
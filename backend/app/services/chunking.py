@@ -0,0 +1,199 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.tokens import count_tokens
+
+# Splitter profiles per file type, in tokens of the embedding model's
+# encoding. Chunks are at most ``chunk_tokens`` long, consecutive chunks of
+# a section share ``overlap_tokens``, and chunks shorter than ``min_tokens``
+# are merged into a neighbour from the same page, or a parent or sibling
+# markdown section, where it fits.
+DEFAULT_CHUNKING_PROFILES = {
+    "pdf": {"chunk_tokens": 400, "overlap_tokens": 40, "min_tokens": 80},
+    "docx": {"chunk_tokens": 400, "overlap_tokens": 40, "min_tokens": 80},
+    "text": {"chunk_tokens": 300, "overlap_tokens": 30, "min_tokens": 60},
+    "markdown": {"chunk_tokens": 350, "overlap_tokens": 30, "min_tokens": 60},
+}
+
+# Boundaries tried in order when a section has to be split further, as
+# regular expressions. The splitter keeps each separator at the start of
+# the next piece, so sentences are split after their ". " instead, which
+# keeps the full stop with its sentence.
+SEPARATORS = {
+    "markdown": ["\n```", "\n\n", "\n- ", r"\n\* ", "\n", r"(?<=\. )", " ", ""],
+    "default": ["\n\n", "\n", r"(?<=\. )", " ", ""],
+}
+
+# Markdown headings that start a new section; their text is kept in the
+# chunk metadata under these keys, and as a heading trail atop every chunk
+MARKDOWN_HEADERS = [("#", "h1"), ("##", "h2"), ("###", "h3")]
+HEADER_KEYS = [key for _, key in MARKDOWN_HEADERS]
+
+def get_chunking_profile(file_type: str) -> Dict[str, int]:
+    """
+    Get the splitter profile for a file type, with any overrides from settings
+    """
+    file_type = file_type.lower()
+    if file_type == "doc":
+        file_type = "docx"
+    if file_type not in DEFAULT_CHUNKING_PROFILES:
+        file_type = "text"
+    profile = dict(DEFAULT_CHUNKING_PROFILES[file_type])
+    profile.update(settings.CHUNKING_PROFILES.get(file_type, {}))
+    return profile
+
+def load_document(path: str, file_type: str) -> list:
+    """
+    Load a file into LangChain documents (one per page for PDFs)
+    """
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
+
+    if file_type.lower() == "pdf":
+        loader = PyPDFLoader(path)
+    elif file_type.lower() in ["docx", "doc"]:
+        loader = Docx2txtLoader(path)
+    else:
+        # Default to text loader
+        loader = TextLoader(path)
+    return loader.load()
+
+def _markdown_sections(documents: list) -> list:
+    """
+    Split markdown documents at their headings, keeping the heading trail
+    of each section in its metadata
+    """
+    from langchain.schema import Document
+    from langchain.text_splitter import MarkdownHeaderTextSplitter
+
+    splitter = MarkdownHeaderTextSplitter(headers_to_split_on=MARKDOWN_HEADERS)
+    sections = []
+    for document in documents:
+        for section in splitter.split_text(document.page_content):
+            sections.append(Document(
+                page_content=section.page_content,
+                metadata={**document.metadata, **section.metadata},
+            ))
+    return sections
+
+def _trail(metadata: Dict[str, Any]) -> List[str]:
+    """
+    Get the heading lines of a markdown chunk's section, outermost first
+    """
+    return [
+        f"{marker} {metadata[key]}"
+        for marker, key in MARKDOWN_HEADERS
+        if key in metadata
+    ]
+
+def _headings(metadata: Dict[str, Any]) -> Tuple:
+    return tuple(metadata[key] for key in HEADER_KEYS if key in metadata)
+
+def _shared_headings(first: Dict[str, Any], second: Dict[str, Any]) -> Optional[int]:
+    """
+    Get how many headings two chunks' sections share, or None if they may
+    not be merged: they must be on the same page, and in the same section,
+    one inside the other, or sibling sections under the same parent
+    """
+    if first.get("page") != second.get("page"):
+        return None
+    a, b = _headings(first), _headings(second)
+    shared = 0
+    while shared < min(len(a), len(b)) and a[shared] == b[shared]:
+        shared += 1
+    nested = shared == min(len(a), len(b))
+    siblings = len(a) == len(b) == shared + 1
+    return shared if nested or siblings else None
+
+def _join_without_overlap(first: str, second: str, max_overlap: int) -> str:
+    """
+    Join two consecutive chunks, dropping the text they share because of
+    the splitter's overlap
+    """
+    for size in range(min(len(first), len(second), max_overlap), 0, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+def merge_small_chunks(chunks: list, profile: Dict[str, int]) -> list:
+    """
+    Merge chunks below the profile's ``min_tokens`` into the previous chunk
+    of the same page, as long as the result stays within ``chunk_tokens``.
+
+    Markdown chunks also merge into a parent or sibling section, so a
+    heading with a line of text doesn't become an embedding of its own. The
+    headings the two share are kept once at the top of the merged text, the
+    other chunk's own headings inline, and the merged chunk's metadata keeps
+    only the shared headings.
+    """
+    # Overlap is measured in tokens; allow a generous number of characters each
+    max_overlap = profile["overlap_tokens"] * 10
+    merged = []
+    sizes: List[int] = []
+    for chunk in chunks:
+        size = count_tokens(chunk.page_content)
+        if merged:
+            previous = merged[-1]
+            shared = _shared_headings(previous.metadata, chunk.metadata)
+            if (
+                shared is not None
+                and (size < profile["min_tokens"] or sizes[-1] < profile["min_tokens"])
+                and sizes[-1] + size <= profile["chunk_tokens"]
+            ):
+                # Every chunk starts with its heading trail; drop the shared part
+                content = chunk.page_content
+                if shared:
+                    content = content.split("\n", shared)[-1]
+                if shared == len(_headings(chunk.metadata)) == len(_headings(previous.metadata)):
+                    content = _join_without_overlap(previous.page_content, content, max_overlap)
+                else:
+                    content = previous.page_content + "\n\n" + content
+                    for key in HEADER_KEYS[shared:]:
+                        previous.metadata.pop(key, None)
+                previous.page_content = content
+                sizes[-1] = count_tokens(content)
+                continue
+        merged.append(chunk)
+        sizes.append(size)
+    return merged
+
+def split_documents(documents: list, file_type: str, profile: Optional[Dict[str, int]] = None) -> list:
+    """
+    Split loaded documents into token-sized chunks using the file type's
+    profile. Chunks never span PDF pages; markdown is split at its headings
+    and every chunk starts with its section's heading trail.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    profile = profile or get_chunking_profile(file_type)
+
+    def _splitter(chunk_tokens: int, separators: List[str]):
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_tokens,
+            chunk_overlap=profile["overlap_tokens"],
+            length_function=count_tokens,
+            separators=separators,
+            is_separator_regex=True,
+        )
+
+    if file_type.lower() != "markdown":
+        chunks = _splitter(profile["chunk_tokens"], SEPARATORS["default"]).split_documents(documents)
+        return merge_small_chunks(chunks, profile)
+
+    chunks = []
+    for section in _markdown_sections(documents):
+        trail = _trail(section.metadata)
+        # Leave room for the trail, which is added to each chunk
+        budget = profile["chunk_tokens"] - (count_tokens("\n".join(trail)) if trail else 0)
+        splitter = _splitter(max(budget, 2 * profile["overlap_tokens"]), SEPARATORS["markdown"])
+        for chunk in splitter.split_documents([section]):
+            if trail:
+                chunk.page_content = "\n".join(trail + [chunk.page_content])
+            chunks.append(chunk)
+    return merge_small_chunks(chunks, profile)
+
+def load_and_split(path: str, file_type: str) -> list:
+    """
+    Load a file and split it into chunks ready for embedding.
+    Counts tokens for every candidate split, so call it off the event loop.
+    """
+    return split_documents(load_document(path, file_type), file_type)
@@ -1,33 +1,113 @@
+import asyncio
+import hashlib
 import os
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import UploadFile, BackgroundTasks
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import AzureOpenAIEmbeddings
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
-from langchain_community.vectorstores import Qdrant
 
 from ..db.mongodb import get_database
 from ..core.config import settings
+from ..core.deadlines import with_deadline
+from .search_cache import (
+    bump_corpus_generation,
+    get_cached_results,
+    make_cache_digest,
+    set_cached_results,
+)
+from .chunk_store import PAYLOAD_FIELDS, get_chunk_store, split_metadata
+from .chunking import load_and_split
+from .snippets import make_snippet
+from .upload_service import (
+    DuplicateDocument,
+    UploadTooLarge,
+    detect_file_type,
+    find_duplicate_document,
+    finish_upload_session,
+    get_upload_limit,
+    spool_upload_file,
+)
+from .vector_filters import METADATA_KEY, build_search_filter, ensure_payload_indexes, to_timestamp
 
-# Initialize embeddings
+COLLECTION_NAME = "documents"
+# Payload key LangChain's Qdrant integration stores chunk text under
+CONTENT_KEY = "page_content"
+# Points per upsert request when writing slim payloads
+UPSERT_BATCH_SIZE = 64
+# A pending document update older than this is assumed to have died with
+# its process and no longer blocks new updates
+UPDATE_LOCK_SECONDS = 3600
+# Likewise a document still processing after this long is assumed to have
+# failed, and is dropped so the same content can be uploaded again
+PROCESSING_STALE_SECONDS = 3600
+
+class DocumentUpdatePending(Exception):
+    """
+    Raised when a document is still being processed or re-indexed
+    """
+
+_qdrant_client = None
+_embeddings = None
+_payload_indexes_ready = False
+_ingestion_semaphore = None
+
+# LangChain, its document loaders and the Qdrant client are imported inside
+# the functions below so they are only loaded once the knowledge base is used.
+
+# Initialize embeddings, reusing one client (and its HTTP connection pool)
 def get_embeddings():
-    return AzureOpenAIEmbeddings(
-        azure_deployment=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
-        openai_api_version=settings.AZURE_OPENAI_API_VERSION,
-        azure_endpoint=settings.AZURE_OPENAI_API_BASE,
-        api_key=settings.AZURE_OPENAI_API_KEY,
-    )
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import AzureOpenAIEmbeddings
+        
+        _embeddings = AzureOpenAIEmbeddings(
+            azure_deployment=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+            openai_api_version=settings.AZURE_OPENAI_API_VERSION,
+            azure_endpoint=settings.AZURE_OPENAI_API_BASE,
+            api_key=settings.AZURE_OPENAI_API_KEY,
+        )
+    return _embeddings
+
+# Initialize vector store client
+def get_qdrant_client():
+    global _qdrant_client
+    if _qdrant_client is None:
+        from qdrant_client import QdrantClient
+        
+        _qdrant_client = QdrantClient(
+            url=settings.VECTOR_DB_URL,
+            api_key=settings.VECTOR_DB_API_KEY or None,
+        )
+    return _qdrant_client
+
+def _ingestion_slots() -> asyncio.Semaphore:
+    """
+    Get the semaphore bounding how many documents this process embeds and
+    indexes at once
+    """
+    global _ingestion_semaphore
+    if _ingestion_semaphore is None:
+        _ingestion_semaphore = asyncio.Semaphore(settings.INGESTION_CONCURRENCY)
+    return _ingestion_semaphore
+
+def close_qdrant_client():
+    """
+    Close the vector store client
+    """
+    global _qdrant_client
+    if _qdrant_client is not None:
+        _qdrant_client.close()
+        _qdrant_client = None
 
 # Initialize vector store
 def get_vector_store():
+    from langchain_community.vectorstores import Qdrant
+    
     embeddings = get_embeddings()
     return Qdrant(
-        client_url=settings.VECTOR_DB_URL,
-        collection_name="documents",
-        embedding_function=embeddings,
-        api_key=settings.VECTOR_DB_API_KEY,
+        client=get_qdrant_client(),
+        collection_name=COLLECTION_NAME,
+        embeddings=embeddings,
     )
 
 async def save_document_metadata(
@@ -39,12 +119,17 @@ async def save_document_metadata(
     file_type: str,
     chunk_count: int,
     user_id: str,
-    tags: List[str] = []
+    tags: List[str] = [],
+    created_at: Optional[datetime] = None,
+    content_hash: Optional[str] = None,
+    chunk_ids: List[str] = [],
+    status: str = "ready"
 ) -> str:
     """
     Save document metadata to MongoDB
     """
     db = await get_database()
+    created_at = created_at or datetime.utcnow()
     
     document = {
         "document_id": document_id,
@@ -54,77 +139,510 @@ async def save_document_metadata(
         "file_size": file_size,
         "file_type": file_type,
         "chunk_count": chunk_count,
+        "chunk_ids": chunk_ids,
+        "version": 1,
         "tags": tags,
         "user_id": user_id,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
+        "content_hash": content_hash,
+        "status": status,
+        "created_at": created_at,
+        "updated_at": created_at,
     }
+    if status == "processing":
+        document["processing_started_at"] = created_at
     
     await db.documents.insert_one(document)
     return document_id
 
+def chunk_point_id(chunk_id: str) -> str:
+    """
+    Get the vector store point ID of a chunk (Qdrant IDs must be UUIDs)
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, chunk_id))
+
+def _assign_chunk_metadata(chunks: list, document_id: str, metadata: Dict[str, Any]) -> List[str]:
+    """
+    Set metadata on each chunk and return their chunk IDs.
+    
+    Chunk IDs are derived from the chunk content, so an unchanged chunk keeps
+    its ID (and its vector) across versions of a document.
+    """
+    chunk_ids = []
+    seen: Dict[str, int] = {}
+    for chunk in chunks:
+        chunk_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        chunk_id = f"{document_id}-{chunk_hash[:16]}"
+        # Repeated passages within a document still need distinct IDs
+        occurrence = seen.get(chunk_id, 0)
+        seen[chunk_id] = occurrence + 1
+        if occurrence:
+            chunk_id = f"{chunk_id}-{occurrence}"
+        
+        chunk.metadata.update({
+            **metadata,
+            "document_id": document_id,
+            "chunk_id": chunk_id,
+            "chunk_hash": chunk_hash,
+            "source": "upload",
+        })
+        chunk_ids.append(chunk_id)
+    return chunk_ids
+
+async def _store_chunks(store, document_id: str, chunks: list) -> None:
+    await store.put_chunks(document_id, [
+        {
+            "chunk_id": chunk.metadata["chunk_id"],
+            "text": chunk.page_content,
+            "metadata": split_metadata(chunk.metadata)[1],
+        }
+        for chunk in chunks
+    ])
+
+async def _add_chunks(document_id: str, chunks: list, chunk_ids: List[str]) -> None:
+    """
+    Embed chunks and add them to the vector store.
+    
+    With a chunk store configured, the text and the metadata search can't
+    filter on go to the store first, and the points only carry a slim
+    payload of IDs and filterable keys.
+    """
+    store = get_chunk_store()
+    if store is None:
+        await asyncio.to_thread(
+            get_vector_store().add_documents, chunks, ids=[chunk_point_id(c) for c in chunk_ids]
+        )
+        return
+    
+    from qdrant_client.http import models as rest
+    
+    await _store_chunks(store, document_id, chunks)
+    vectors = await get_embeddings().aembed_documents([c.page_content for c in chunks])
+    points = [
+        rest.PointStruct(
+            id=chunk_point_id(chunk_id),
+            vector=vector,
+            payload={METADATA_KEY: split_metadata(chunk.metadata)[0]},
+        )
+        for chunk, chunk_id, vector in zip(chunks, chunk_ids, vectors)
+    ]
+    client = get_qdrant_client()
+    for start in range(0, len(points), UPSERT_BATCH_SIZE):
+        await asyncio.to_thread(
+            client.upsert, collection_name=COLLECTION_NAME, points=points[start:start + UPSERT_BATCH_SIZE]
+        )
+
+def _ensure_payload_indexes():
+    global _payload_indexes_ready
+    if not _payload_indexes_ready:
+        ensure_payload_indexes(get_qdrant_client(), COLLECTION_NAME)
+        _payload_indexes_ready = True
+
+async def _delete_document_chunks(document_id: str) -> None:
+    from qdrant_client.http import models as rest
+    
+    await asyncio.to_thread(
+        get_qdrant_client().delete,
+        collection_name=COLLECTION_NAME,
+        points_selector=rest.FilterSelector(
+            filter=build_search_filter(None, {"document_id": document_id})
+        ),
+    )
+    store = get_chunk_store()
+    if store is not None:
+        await store.delete_document(document_id)
+
 async def process_document(
     temp_file_path: str,
     file_type: str,
     document_id: str,
     title: str,
-    description: Optional[str],
-    file_size: int,
     user_id: str,
-    tags: List[str] = []
+    tags: List[str] = [],
+    created_at: Optional[datetime] = None
 ):
     """
-    Process document in the background
-    """
-    try:
-        # Load document based on file type
-        if file_type.lower() == "pdf":
-            loader = PyPDFLoader(temp_file_path)
-        elif file_type.lower() in ["docx", "doc"]:
-            loader = Docx2txtLoader(temp_file_path)
-        else:
-            # Default to text loader
-            loader = TextLoader(temp_file_path)
-        
-        documents = loader.load()
-        
-        # Split text into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
-        )
-        chunks = text_splitter.split_documents(documents)
-        
-        # Set metadata for each chunk
-        for i, chunk in enumerate(chunks):
-            chunk.metadata.update({
-                "document_id": document_id,
-                "chunk_id": f"{document_id}-{i}",
+    Process document in the background, completing the "processing"
+    record written when it was queued. Waits for one of the
+    INGESTION_CONCURRENCY slots first.
+    """
+    created_at = created_at or datetime.utcnow()
+    db = await get_database()
+    async with _ingestion_slots():
+        try:
+            # Processing starts once a slot is free; time spent queued
+            # doesn't count towards PROCESSING_STALE_SECONDS
+            result = await db.documents.update_one(
+                {"document_id": document_id, "status": "processing"},
+                {"$set": {"processing_started_at": datetime.utcnow()}},
+            )
+            if result.matched_count == 0:
+                # Deleted, or given up as stale, while it was queued
+                return
+                
+            chunks = await asyncio.to_thread(load_and_split, temp_file_path, file_type)
+            
+            # Set metadata for each chunk, including the fields search can filter on
+            chunk_ids = _assign_chunk_metadata(chunks, document_id, {
                 "user_id": user_id,
                 "title": title,
-                "source": "upload",
+                "tags": tags,
+                "file_type": file_type,
+                "created_at_ts": to_timestamp(created_at),
             })
+            
+            # Add to vector store
+            await _add_chunks(document_id, chunks, chunk_ids)
+            await asyncio.to_thread(_ensure_payload_indexes)
+            
+            # Update metadata in MongoDB
+            result = await db.documents.update_one(
+                {"document_id": document_id},
+                {"$set": {
+                    "chunk_count": len(chunks),
+                    "chunk_ids": chunk_ids,
+                    "status": "ready",
+                    "updated_at": datetime.utcnow(),
+                }, "$unset": {"processing_started_at": ""}},
+            )
+            if result.matched_count == 0:
+                # The document was deleted while it was being processed
+                await _delete_document_chunks(document_id)
+                return
+            
+            # New chunks are searchable, drop this user's cached results
+            await bump_corpus_generation(user_id)
+        except Exception:
+            # Drop the half-indexed document so the upload can be sent again
+            await db.documents.delete_one({"document_id": document_id, "status": "processing"})
+            await _delete_document_chunks(document_id)
+            raise
+        finally:
+            # Clean up temporary file
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
+async def reindex_document(
+    document_id: str,
+    update_id: str,
+    temp_file_path: str,
+    file_type: str,
+    file_size: int,
+    content_hash: str,
+    title: str,
+    description: Optional[str],
+    tags: List[str]
+) -> Dict[str, int]:
+    """
+    Re-index a new version of a document, embedding only the chunks whose
+    content changed and deleting the ones that disappeared.
+    
+    The caller must hold the document's pending update ``update_id``; the
+    chunks are diffed against the record as it is now, which no other
+    update can change until this one finishes. Shares the ingestion slots
+    with process_document. Returns how many chunks were added, removed and
+    kept.
+    """
+    from qdrant_client.http import models as rest
+    
+    db = await get_database()
+    async with _ingestion_slots():
+        try:
+            # Likewise the update lock is only aged from when re-indexing starts
+            document = await db.documents.find_one_and_update(
+                {"document_id": document_id, "pending_update.id": update_id},
+                {"$set": {"pending_update.started_at": datetime.utcnow()}},
+            )
+            if document is None:
+                # Deleted, or the update was given up as stale
+                return {"added": 0, "removed": 0, "kept": 0}
+            user_id = document["user_id"]
+            chunks = await asyncio.to_thread(load_and_split, temp_file_path, file_type)
+            chunk_ids = _assign_chunk_metadata(chunks, document_id, {
+                "user_id": user_id,
+                "title": title,
+                "tags": tags,
+                "file_type": file_type,
+                "created_at_ts": to_timestamp(document["created_at"]),
+            })
+            
+            client = get_qdrant_client()
+            old_chunk_ids = set(document.get("chunk_ids") or [])
+            if not old_chunk_ids:
+                # Indexed before chunk IDs were content-derived: replace everything
+                await asyncio.to_thread(
+                    client.delete,
+                    collection_name=COLLECTION_NAME,
+                    points_selector=rest.FilterSelector(
+                        filter=build_search_filter(None, {"document_id": document_id})
+                    ),
+                )
+            
+            added = [(c, i) for c, i in zip(chunks, chunk_ids) if i not in old_chunk_ids]
+            kept = [(c, i) for c, i in zip(chunks, chunk_ids) if i in old_chunk_ids]
+            removed = old_chunk_ids - set(chunk_ids)
+            
+            store = get_chunk_store()
+            if added:
+                await _add_chunks(document_id, [c for c, _ in added], [i for _, i in added])
+            if removed:
+                await asyncio.to_thread(
+                    client.delete,
+                    collection_name=COLLECTION_NAME,
+                    points_selector=rest.PointIdsList(points=[chunk_point_id(i) for i in removed]),
+                )
+                if store is not None:
+                    await store.delete_chunks(list(removed))
+            if kept:
+                # Unchanged text keeps its vector; only refresh the metadata
+                # (title, tags, page...) in a single payload-only batch
+                if store is not None:
+                    await _store_chunks(store, document_id, [c for c, _ in kept])
+                await asyncio.to_thread(
+                    client.batch_update_points,
+                    collection_name=COLLECTION_NAME,
+                    update_operations=[
+                        rest.SetPayloadOperation(set_payload=rest.SetPayload(
+                            payload={METADATA_KEY: split_metadata(c.metadata)[0] if store is not None else c.metadata},
+                            points=[chunk_point_id(i)],
+                        ))
+                        for c, i in kept
+                    ],
+                )
+            await asyncio.to_thread(_ensure_payload_indexes)
+            
+            result = await db.documents.update_one(
+                {"document_id": document_id, "pending_update.id": update_id},
+                {
+                    "$set": {
+                        "filename": os.path.basename(temp_file_path),
+                        "title": title,
+                        "description": description,
+                        "tags": tags,
+                        "file_size": file_size,
+                        "file_type": file_type,
+                        "content_hash": content_hash,
+                        "chunk_count": len(chunks),
+                        "chunk_ids": chunk_ids,
+                        "updated_at": datetime.utcnow(),
+                    },
+                    "$inc": {"version": 1},
+                    "$unset": {"pending_update": ""},
+                },
+            )
+            if result.matched_count == 0 and not await db.documents.find_one({"document_id": document_id}):
+                # The document was deleted while it was being re-indexed
+                await _delete_document_chunks(document_id)
+            
+            await bump_corpus_generation(user_id)
+            return {"added": len(added), "removed": len(removed), "kept": len(kept)}
+        except Exception:
+            await db.documents.update_one(
+                {"document_id": document_id, "pending_update.id": update_id},
+                {"$unset": {"pending_update": ""}},
+            )
+            raise
+        finally:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
+async def update_document(
+    document_id: str,
+    user_id: str,
+    file: UploadFile,
+    background_tasks: BackgroundTasks,
+    title: Optional[str] = None,
+    description: Optional[str] = None,
+    tags: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Upload a new version of a document and re-index it incrementally in the
+    background. Returns None if the user has no such document, and raises
+    DocumentUpdatePending while it is still being processed or an earlier
+    update is being applied.
+    """
+    db = await get_database()
+    document = await db.documents.find_one({
+        "document_id": document_id,
+        "user_id": user_id
+    })
+    if not document:
+        return None
+    if document.get("status") == "processing":
+        if _is_stale_processing(document, datetime.utcnow()) and await _discard_stale_processing(document):
+            return None
+        raise DocumentUpdatePending("The document is still being processed")
+    if not _can_update(document, datetime.utcnow()):
+        raise DocumentUpdatePending("The document has an update in progress")
+    
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    temp_file_path = os.path.join(
+        settings.UPLOAD_TEMP_DIR, f"{document_id}-{uuid.uuid4().hex}{file_extension}"
+    )
+    await asyncio.to_thread(os.makedirs, settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    
+    # The new version replaces the old one, so it may use the old one's quota
+    max_bytes = min(
+        settings.UPLOAD_MAX_BYTES,
+        await get_upload_limit(user_id) + document.get("file_size", 0)
+    )
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge("Upload exceeds the size limit or storage quota")
+    file_size, content_hash = await spool_upload_file(file, temp_file_path, max_bytes)
+    
+    duplicate = await find_duplicate_document(user_id, content_hash)
+    if duplicate and _is_stale_processing(duplicate, datetime.utcnow()):
+        await _discard_stale_processing(duplicate)
+        duplicate = await find_duplicate_document(user_id, content_hash)
+    if duplicate and duplicate["document_id"] != document_id:
+        await asyncio.to_thread(os.remove, temp_file_path)
+        raise DuplicateDocument(duplicate["document_id"])
+    
+    title = title if title is not None else document["title"]
+    description = description if description is not None else document.get("description")
+    tags = tags if tags is not None else document.get("tags", [])
+    unchanged = (
+        content_hash == document.get("content_hash")
+        and (title, description, tags) == (document["title"], document.get("description"), document.get("tags", []))
+    )
+    if unchanged:
+        await asyncio.to_thread(os.remove, temp_file_path)
+    else:
+        # Claim the document for this update, unless another request did so
+        # since it was read; the claim is released when re-indexing ends.
+        # Documents written before versioning have no version field, which
+        # the claim sets so that re-indexing increments it from 1.
+        update_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        result = await db.documents.update_one(
+            {
+                "document_id": document_id,
+                "version": document.get("version", {"$exists": False}),
+                "status": {"$ne": "processing"},
+                "$or": [
+                    {"pending_update": {"$exists": False}},
+                    {"pending_update.started_at": {"$lt": now - timedelta(seconds=UPDATE_LOCK_SECONDS)}},
+                ],
+            },
+            {"$set": {
+                "pending_update": {"id": update_id, "started_at": now},
+                "version": document.get("version", 1),
+            }},
+        )
+        if result.modified_count == 0:
+            await asyncio.to_thread(os.remove, temp_file_path)
+            raise DocumentUpdatePending("The document has an update in progress")
         
-        # Add to vector store
-        vector_store = get_vector_store()
-        vector_store.add_documents(chunks)
-        
-        # Update metadata in MongoDB
-        await save_document_metadata(
+        background_tasks.add_task(
+            reindex_document,
             document_id=document_id,
-            filename=os.path.basename(temp_file_path),
+            update_id=update_id,
+            temp_file_path=temp_file_path,
+            file_type=detect_file_type(file.filename),
+            file_size=file_size,
+            content_hash=content_hash,
             title=title,
             description=description,
-            file_size=file_size,
-            file_type=file_type,
-            chunk_count=len(chunks),
-            user_id=user_id,
             tags=tags
         )
-    finally:
-        # Clean up temporary file
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+    
+    current_version = document.get("version", 1)
+    return {
+        "document_id": document_id,
+        "version": current_version if unchanged else current_version + 1,
+        "unchanged": unchanged
+    }
+
+def _can_update(document: Dict[str, Any], now: datetime) -> bool:
+    pending = document.get("pending_update")
+    return pending is None or pending["started_at"] < now - timedelta(seconds=UPDATE_LOCK_SECONDS)
+
+def _is_stale_processing(document: Dict[str, Any], now: datetime) -> bool:
+    if document.get("status") != "processing":
+        return False
+    # Records written before processing_started_at existed use created_at
+    started_at = document.get("processing_started_at", document["created_at"])
+    return started_at < now - timedelta(seconds=PROCESSING_STALE_SECONDS)
+
+async def _discard_stale_processing(document: Dict[str, Any]) -> bool:
+    """
+    Delete a document whose processing died, with any chunks it left
+    behind. Returns False if the record changed since it was read.
+    """
+    db = await get_database()
+    result = await db.documents.delete_one({
+        "document_id": document["document_id"],
+        "status": "processing",
+        "processing_started_at": document.get("processing_started_at"),
+    })
+    if result.deleted_count == 0:
+        return False
+    await _delete_document_chunks(document["document_id"])
+    return True
+
+async def queue_document_processing(
+    document_id: str,
+    temp_file_path: str,
+    file_type: str,
+    file_size: int,
+    content_hash: str,
+    title: str,
+    description: Optional[str],
+    tags: List[str],
+    user_id: str,
+    background_tasks: BackgroundTasks
+) -> Tuple[str, bool]:
+    """
+    Schedule processing of a spooled upload, unless the user already has a
+    document with the same content. Returns the document ID and whether the
+    upload was a duplicate.
+    """
+    from pymongo.errors import DuplicateKeyError
+    
+    created_at = datetime.utcnow()
+    while True:
+        try:
+            # Record the document before processing it, so the unique
+            # (user_id, content_hash) index also turns away copies sent while
+            # the first one is still being embedded
+            await save_document_metadata(
+                document_id=document_id,
+                filename=os.path.basename(temp_file_path),
+                title=title,
+                description=description,
+                file_size=file_size,
+                file_type=file_type,
+                chunk_count=0,
+                user_id=user_id,
+                tags=tags,
+                created_at=created_at,
+                content_hash=content_hash,
+                status="processing"
+            )
+            break
+        except DuplicateKeyError:
+            duplicate = await find_duplicate_document(user_id, content_hash)
+            if duplicate is not None and _is_stale_processing(duplicate, created_at):
+                # The earlier copy never finished processing; this one replaces it
+                await _discard_stale_processing(duplicate)
+                continue
+            await asyncio.to_thread(os.remove, temp_file_path)
+            if duplicate is None:
+                # Deleted again in the meantime
+                raise
+            return duplicate["document_id"], True
+    
+    # Process document in background
+    background_tasks.add_task(
+        process_document,
+        temp_file_path=temp_file_path,
+        file_type=file_type,
+        document_id=document_id,
+        title=title,
+        user_id=user_id,
+        tags=tags,
+        created_at=created_at
+    )
+    return document_id, False
 
 async def upload_document(
     file: UploadFile,
@@ -133,92 +651,187 @@ async def upload_document(
     tags: List[str] = [],
     user_id: str = None,
     background_tasks: BackgroundTasks = None
-) -> str:
+) -> Tuple[str, bool]:
     """
-    Upload a document to the system
+    Upload a document to the system.
+    Returns the document ID and whether the content was already uploaded.
     """
     # Generate unique ID for document
     document_id = str(uuid.uuid4())
     
-    # Save file to temporary location
-    file_size = 0
-    temp_dir = "/tmp/ai_platform_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    
     file_extension = os.path.splitext(file.filename)[1].lower()
-    temp_file_path = f"{temp_dir}/{document_id}{file_extension}"
-    
-    with open(temp_file_path, "wb") as f:
-        # Read file in chunks to avoid memory issues with large files
-        while content := await file.read(1024 * 1024):
-            file_size += len(content)
-            f.write(content)
-    
-    # Determine file type
-    if file_extension in [".pdf"]:
-        file_type = "pdf"
-    elif file_extension in [".docx", ".doc"]:
-        file_type = "docx"
-    elif file_extension in [".txt", ".md", ".rst"]:
-        file_type = "text"
-    else:
-        file_type = "unknown"
+    temp_file_path = os.path.join(settings.UPLOAD_TEMP_DIR, f"{document_id}{file_extension}")
+    await asyncio.to_thread(os.makedirs, settings.UPLOAD_TEMP_DIR, exist_ok=True)
     
-    # Process document in background
-    background_tasks.add_task(
-        process_document,
-        temp_file_path=temp_file_path,
-        file_type=file_type,
+    # Reject oversized files before copying them
+    max_bytes = await get_upload_limit(user_id)
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge("Upload exceeds the size limit or storage quota")
+    
+    # Save file to temporary location, hashing it on the way
+    file_size, content_hash = await spool_upload_file(file, temp_file_path, max_bytes)
+    
+    return await queue_document_processing(
         document_id=document_id,
+        temp_file_path=temp_file_path,
+        file_type=detect_file_type(file.filename),
+        file_size=file_size,
+        content_hash=content_hash,
         title=title,
         description=description,
-        file_size=file_size,
+        tags=tags,
         user_id=user_id,
-        tags=tags
+        background_tasks=background_tasks
     )
+
+async def complete_resumable_upload(
+    session: Dict[str, Any],
+    background_tasks: BackgroundTasks
+) -> Tuple[str, bool]:
+    """
+    Hand a fully received resumable upload over to document processing
+    """
+    content_hash = await finish_upload_session(session)
     
-    return document_id
+    document_id = str(uuid.uuid4())
+    file_extension = os.path.splitext(session["filename"])[1].lower()
+    temp_file_path = os.path.join(settings.UPLOAD_TEMP_DIR, f"{document_id}{file_extension}")
+    await asyncio.to_thread(os.replace, session["path"], temp_file_path)
+    
+    return await queue_document_processing(
+        document_id=document_id,
+        temp_file_path=temp_file_path,
+        file_type=session["file_type"],
+        file_size=session["size"],
+        content_hash=content_hash,
+        title=session["title"],
+        description=session["description"],
+        tags=session["tags"],
+        user_id=session["user_id"],
+        background_tasks=background_tasks
+    )
+
+def _payload_selector(fields: Optional[List[str]], snippet: bool):
+    """
+    Build the payload projection for a search so the vector store only
+    returns the keys the caller asked for
+    """
+    from qdrant_client.http import models as rest
+    
+    if fields is None:
+        return True
+    
+    include = [f"{METADATA_KEY}.{field}" for field in fields if field != "content"]
+    if "content" in fields or snippet:
+        include.append(CONTENT_KEY)
+    if not include:
+        return False
+    return rest.PayloadSelectorInclude(include=include)
 
 async def search_documents(
     query: str,
     filters: Dict[str, Any] = {},
     limit: int = 5,
-    user_id: Optional[str] = None
+    user_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    snippet_length: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
-    Search documents in the vector store
+    Search documents in the vector store.
+    
+    ``fields`` limits each hit to the listed metadata keys (plus "content"
+    for the full chunk text); ``snippet_length`` adds a query-centered
+    excerpt instead of the full text unless "content" is requested too.
     """
-    vector_store = get_vector_store()
+    snippet = snippet_length is not None
+    include_content = "content" in fields if fields is not None else not snippet
+    store = get_chunk_store()
     
-    # Apply filters if any
-    search_kwargs = {}
-    if user_id:
-        search_kwargs["filter"] = {"user_id": user_id}
+    query_vector = await with_deadline(get_embeddings().aembed_query(query))
     
-    # Search vector store
-    results = vector_store.similarity_search_with_score(
-        query=query,
-        k=limit,
-        **search_kwargs
+    # Filters and the payload projection are evaluated by the vector store,
+    # so neither unmatched points nor unneeded payload leave the index.
+    # Slim payloads are small enough to fetch whole. The client is blocking,
+    # so it runs in a worker thread that is abandoned at the request deadline.
+    results = await with_deadline(asyncio.to_thread(
+        get_qdrant_client().search,
+        collection_name=COLLECTION_NAME,
+        query_vector=query_vector,
+        query_filter=build_search_filter(user_id, filters),
+        limit=limit,
+        with_payload=True if store is not None else _payload_selector(fields, snippet),
+    ))
+    payloads = [point.payload or {} for point in results]
+    
+    # Hydrate text and the remaining metadata of the top hits from the
+    # chunk store in one lookup, unless the slim payload already has all
+    # that was asked for
+    records: Dict[str, Dict[str, Any]] = {}
+    needs_store = (
+        include_content
+        or snippet
+        or fields is None
+        or any(field not in PAYLOAD_FIELDS for field in fields if field != "content")
     )
+    if store is not None and needs_store:
+        chunk_ids = [(p.get(METADATA_KEY) or {}).get("chunk_id") for p in payloads]
+        records = await with_deadline(store.get_chunks([c for c in chunk_ids if c]))
     
     # Format results
     formatted_results = []
-    for doc, score in results:
-        formatted_results.append({
-            "content": doc.page_content,
-            "metadata": doc.metadata,
-            "score": float(score)
-        })
+    for point, payload in zip(results, payloads):
+        metadata = payload.get(METADATA_KEY) or {}
+        text = payload.get(CONTENT_KEY) or ""
+        record = records.get(metadata.get("chunk_id"))
+        if record is not None:
+            text = record["text"]
+            metadata = {**record["metadata"], **metadata}
+        if store is not None and fields is not None:
+            metadata = {k: v for k, v in metadata.items() if k in fields}
+        result = {
+            "metadata": metadata,
+            "score": float(point.score),
+        }
+        if include_content:
+            result["content"] = text
+        if snippet:
+            result["snippet"] = make_snippet(text, query, snippet_length)
+        formatted_results.append(result)
     
     return formatted_results
 
+async def cached_search_documents(
+    query: str,
+    filters: Dict[str, Any] = {},
+    limit: int = 5,
+    user_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    snippet_length: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Search documents, serving repeated queries from the result cache.
+    Returns the results and whether they came from the cache.
+    """
+    if not user_id:
+        results = await search_documents(query, filters, limit, user_id, fields, snippet_length)
+        return results, False
+    
+    digest = make_cache_digest(query, limit, filters, fields=fields, snippet_length=snippet_length)
+    results, generation = await get_cached_results(user_id, digest)
+    if results is not None:
+        return results, True
+    
+    results = await search_documents(query, filters, limit, user_id, fields, snippet_length)
+    if generation is not None:
+        await set_cached_results(user_id, digest, generation, results)
+    return results, False
+
 async def get_document_by_id(document_id: str) -> Optional[Dict[str, Any]]:
     """
     Get document metadata by ID
     """
     db = await get_database()
-    document = await db.documents.find_one({"document_id": document_id})
+    document = await db.documents.find_one({"document_id": document_id}, {"chunk_ids": 0})
     
     if document:
         document["_id"] = str(document["_id"])
@@ -245,7 +858,64 @@ async def delete_document(document_id: str, user_id: str) -> bool:
     await db.documents.delete_one({"document_id": document_id})
     
     # Delete from vector store
-    vector_store = get_vector_store()
-    vector_store.delete(filter={"document_id": document_id})
+    await _delete_document_chunks(document_id)
+    
+    await bump_corpus_generation(user_id)
     
-    return True 
\ No newline at end of file
+    return True 
+def _backfill_points(document: Dict[str, Any], fields: Dict[str, Any]) -> int:
+    from qdrant_client.http import models as rest
+    
+    client = get_qdrant_client()
+    updated = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=COLLECTION_NAME,
+            scroll_filter=build_search_filter(None, {"document_id": document["document_id"]}),
+            limit=256,
+            offset=offset,
+            with_payload=[METADATA_KEY],
+            with_vectors=False,
+        )
+        operations = []
+        for record in records:
+            metadata = (record.payload or {}).get(METADATA_KEY) or {}
+            if all(metadata.get(key) == value for key, value in fields.items()):
+                continue
+            operations.append(rest.SetPayloadOperation(set_payload=rest.SetPayload(
+                payload={METADATA_KEY: {**metadata, **fields}},
+                points=[record.id],
+            )))
+        if operations:
+            client.batch_update_points(collection_name=COLLECTION_NAME, update_operations=operations)
+            updated += len(operations)
+        if offset is None:
+            return updated
+
+async def backfill_filter_fields() -> Dict[str, int]:
+    """
+    Copy the filterable fields (tags, file type, creation time...) from the
+    documents collection onto the chunks of every document. Points indexed
+    before these fields existed are otherwise left out of any search that
+    filters on them. Returns how many documents were scanned and points
+    updated; running it again only touches points still missing a field.
+    """
+    db = await get_database()
+    documents = points = 0
+    cursor = db.documents.find(
+        {"status": {"$ne": "processing"}},
+        {"document_id": 1, "user_id": 1, "title": 1, "tags": 1, "file_type": 1, "created_at": 1},
+    )
+    async for document in cursor:
+        fields = {
+            "user_id": document["user_id"],
+            "title": document["title"],
+            "tags": document.get("tags") or [],
+            "file_type": document.get("file_type"),
+            "created_at_ts": to_timestamp(document["created_at"]),
+        }
+        points += await asyncio.to_thread(_backfill_points, document, fields)
+        documents += 1
+    await asyncio.to_thread(_ensure_payload_indexes)
+    return {"documents": documents, "points": points}
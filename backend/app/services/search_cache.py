@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Entries are namespaced by the user's corpus generation, so bumping the
+# generation invalidates every cached result for that user at once.
+GENERATION_KEY = "search:gen:{user_id}"
+RESULT_KEY = "search:res:{user_id}:{generation}:{digest}"
+
+_near_cache = TTLCache(
+    max_entries=settings.SEARCH_CACHE_NEAR_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_NEAR_TTL_SECONDS,
+)
+# Corpus generations read recently, so a near cache hit needs no Redis call
+_generations = TTLCache(
+    max_entries=settings.SEARCH_CACHE_NEAR_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_GENERATION_TTL_SECONDS,
+)
+_stats = {"hits": 0, "misses": 0}
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different spellings share a cache entry
+    """
+    return " ".join(query.lower().split())
+
+def make_cache_digest(query: str, limit: int, filters: Dict[str, Any], **options: Any) -> str:
+    """
+    Build a stable digest for a search request
+    """
+    key = {
+        "query": normalize_query(query),
+        "limit": limit,
+        "filters": filters or {},
+        "options": options,
+    }
+    encoded = json.dumps(key, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+async def get_corpus_generation(user_id: str) -> int:
+    """
+    Get the current corpus generation for a user, reusing the last one read
+    for up to SEARCH_CACHE_GENERATION_TTL_SECONDS
+    """
+    generation = _generations.get(user_id)
+    if generation is None:
+        redis = await get_redis()
+        stored = await redis.get(GENERATION_KEY.format(user_id=user_id))
+        generation = int(stored) if stored is not None else 0
+        _generations.set(user_id, generation)
+    return generation
+
+async def bump_corpus_generation(user_id: str) -> None:
+    """
+    Invalidate all cached search results for a user
+    """
+    if not settings.SEARCH_CACHE_ENABLED:
+        return
+    try:
+        redis = await get_redis()
+        _generations.set(user_id, await redis.incr(GENERATION_KEY.format(user_id=user_id)))
+    except RedisError as e:
+        _generations.pop(user_id)
+        logger.warning("Could not bump search cache generation for %s: %s", user_id, e)
+
+async def get_cached_results(user_id: str, digest: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[int]]:
+    """
+    Look up cached results for a request digest.
+
+    Returns the cached results (or None on a miss) together with the corpus
+    generation they are keyed on. The generation must be passed back to
+    ``set_cached_results`` so a write that lands mid-search cannot be masked
+    by a stale entry; it is None when the cache is disabled or unavailable.
+    """
+    if not settings.SEARCH_CACHE_ENABLED:
+        return None, None
+    try:
+        generation = await get_corpus_generation(user_id)
+        key = RESULT_KEY.format(user_id=user_id, generation=generation, digest=digest)
+
+        results = _near_cache.get(key)
+        if results is None:
+            redis = await get_redis()
+            cached = await redis.get(key)
+            if cached is not None:
+                results = json.loads(cached)
+                _near_cache.set(key, results)
+    except RedisError as e:
+        logger.warning("Search cache lookup failed: %s", e)
+        return None, None
+
+    if results is None:
+        _stats["misses"] += 1
+    else:
+        _stats["hits"] += 1
+    return results, generation
+
+async def set_cached_results(
+    user_id: str,
+    digest: str,
+    generation: int,
+    results: List[Dict[str, Any]]
+) -> None:
+    """
+    Store search results under the generation they were computed against
+    """
+    if not settings.SEARCH_CACHE_ENABLED:
+        return
+    key = RESULT_KEY.format(user_id=user_id, generation=generation, digest=digest)
+    try:
+        redis = await get_redis()
+        await redis.set(
+            key,
+            json.dumps(results, default=str),
+            ex=settings.SEARCH_CACHE_TTL_SECONDS,
+        )
+    except RedisError as e:
+        logger.warning("Search cache store failed: %s", e)
+        return
+    _near_cache.set(key, results)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit/miss counters for this process
+    """
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "hit_ratio": _stats["hits"] / lookups if lookups else 0.0,
+    }
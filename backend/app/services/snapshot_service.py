@@ -0,0 +1,469 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..db.mongodb import get_database
+from .chunk_store import get_chunk_store, split_metadata
+from .knowledge_service import COLLECTION_NAME, CONTENT_KEY, get_qdrant_client
+from .search_cache import bump_corpus_generation
+from .vector_filters import METADATA_KEY, ensure_payload_indexes
+
+# A snapshot is a directory holding:
+#   manifest.json        collection config, shard list and export progress
+#   documents.jsonl.gz   the documents collection, one Extended JSON line each
+#   chunks-NNNNN.npz     one compressed shard per scroll page: point IDs,
+#                        float32 vectors, chunk text and full chunk metadata
+# Chunk text is stored apart from the payload, so a snapshot can be loaded
+# into either CHUNK_STORE layout regardless of the one it was taken from.
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+DOCUMENTS_FILE = "documents.jsonl.gz"
+DOCUMENTS_BATCH_SIZE = 500
+
+# Called with the stage ("documents" or "chunks"), items done and the total
+ProgressCallback = Callable[[str, int, int], None]
+
+# Export/import jobs started through the admin API live in the
+# snapshot_jobs collection, so any replica can report on them. A running
+# job writes its progress every JOB_HEARTBEAT_SECONDS; one silent for
+# JOB_STALE_SECONDS died with its process and no longer holds its
+# snapshot name.
+JOB_HEARTBEAT_SECONDS = 5
+JOB_STALE_SECONDS = 120
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    # Write then rename, so an interrupted run never leaves a torn manifest
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _pack_strings(values: List[str]):
+    import numpy as np
+
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64)
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _unpack_strings(blob, offsets) -> List[str]:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+def _write_shard(path: str, ids: List[Any], vectors: List[List[float]], texts: List[str], metadata: List[Dict[str, Any]]) -> None:
+    import numpy as np
+
+    ids_blob, ids_offsets = _pack_strings([json.dumps(i) for i in ids])
+    texts_blob, texts_offsets = _pack_strings(texts)
+    metadata_blob, metadata_offsets = _pack_strings([json.dumps(m, separators=(",", ":")) for m in metadata])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            ids=ids_blob,
+            ids_offsets=ids_offsets,
+            vectors=np.asarray(vectors, dtype=np.float32),
+            texts=texts_blob,
+            texts_offsets=texts_offsets,
+            metadata=metadata_blob,
+            metadata_offsets=metadata_offsets,
+        )
+    os.replace(tmp_path, path)
+
+def _read_shard(path: str) -> Tuple[List[Any], Any, List[str], List[Dict[str, Any]]]:
+    import numpy as np
+
+    with np.load(path, allow_pickle=False) as shard:
+        ids = [json.loads(i) for i in _unpack_strings(shard["ids"], shard["ids_offsets"])]
+        texts = _unpack_strings(shard["texts"], shard["texts_offsets"])
+        metadata = [json.loads(m) for m in _unpack_strings(shard["metadata"], shard["metadata_offsets"])]
+        return ids, shard["vectors"], texts, metadata
+
+async def _export_documents(path: str) -> int:
+    from bson import json_util
+
+    db = await get_database()
+    f = await asyncio.to_thread(gzip.open, os.path.join(path, DOCUMENTS_FILE), "wt", encoding="utf-8")
+    count = 0
+    try:
+        lines = []
+        async for document in db.documents.find({}, {"_id": 0}):
+            lines.append(json_util.dumps(document) + "\n")
+            if len(lines) >= DOCUMENTS_BATCH_SIZE:
+                await asyncio.to_thread(f.writelines, lines)
+                count += len(lines)
+                lines = []
+        await asyncio.to_thread(f.writelines, lines)
+        count += len(lines)
+    finally:
+        await asyncio.to_thread(f.close)
+    return count
+
+async def _hydrate_records(records: list) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Get the text and full metadata of exported points, looking up chunks
+    whose text lives in the chunk store in one bulk read
+    """
+    store = get_chunk_store()
+    stored = {}
+    if store is not None:
+        chunk_ids = [
+            (r.payload or {}).get(METADATA_KEY, {}).get("chunk_id")
+            for r in records
+            if CONTENT_KEY not in (r.payload or {})
+        ]
+        stored = await store.get_chunks([c for c in chunk_ids if c])
+
+    texts, metadata = [], []
+    for record in records:
+        payload = record.payload or {}
+        chunk_metadata = payload.get(METADATA_KEY) or {}
+        text = payload.get(CONTENT_KEY)
+        if text is None:
+            chunk = stored.get(chunk_metadata.get("chunk_id"), {"text": "", "metadata": {}})
+            text = chunk["text"]
+            chunk_metadata = {**chunk["metadata"], **chunk_metadata}
+        texts.append(text)
+        metadata.append(chunk_metadata)
+    return texts, metadata
+
+async def export_snapshot(
+    path: str,
+    shard_size: Optional[int] = None,
+    restart: bool = False,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Export the documents collection and every vector store point (vector,
+    chunk text and metadata) to a snapshot directory.
+
+    An interrupted export resumes from its last complete shard when run
+    again on the same directory, unless ``restart`` is set. Returns the
+    manifest.
+    """
+    shard_size = shard_size or settings.SNAPSHOT_SHARD_SIZE
+    await asyncio.to_thread(os.makedirs, path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    client = get_qdrant_client()
+
+    manifest = None if restart else await asyncio.to_thread(_read_json, manifest_path)
+    if manifest is not None and manifest["complete"]:
+        return manifest
+    if manifest is None:
+        info = await asyncio.to_thread(client.get_collection, COLLECTION_NAME)
+        vectors = info.config.params.vectors
+        if isinstance(vectors, dict):
+            raise ValueError("Collections with named vectors are not supported")
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "collection": COLLECTION_NAME,
+            "vector_size": vectors.size,
+            "distance": vectors.distance.value,
+            "created_at": datetime.utcnow().isoformat(),
+            "documents": None,
+            "points": 0,
+            "shards": [],
+            "next_offset": None,
+            "complete": False,
+        }
+
+    total = (await asyncio.to_thread(client.count, COLLECTION_NAME, exact=True)).count
+
+    if manifest["documents"] is None:
+        manifest["documents"] = await _export_documents(path)
+        await asyncio.to_thread(_write_json, manifest_path, manifest)
+        if progress:
+            progress("documents", manifest["documents"], manifest["documents"])
+
+    offset = manifest["next_offset"]
+    while not manifest["complete"]:
+        records, next_offset = await asyncio.to_thread(
+            client.scroll,
+            COLLECTION_NAME,
+            limit=shard_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            texts, metadata = await _hydrate_records(records)
+            name = f"chunks-{len(manifest['shards']):05d}.npz"
+            await asyncio.to_thread(
+                _write_shard,
+                os.path.join(path, name),
+                [r.id for r in records],
+                [r.vector for r in records],
+                texts,
+                metadata,
+            )
+            manifest["shards"].append({"file": name, "points": len(records)})
+            manifest["points"] += len(records)
+        # The last shard and the completion flag are saved together, so a
+        # resumed export never scrolls from the start again
+        manifest["next_offset"] = next_offset
+        manifest["complete"] = next_offset is None
+        await asyncio.to_thread(_write_json, manifest_path, manifest)
+        if progress:
+            progress("chunks", manifest["points"], max(total, manifest["points"]))
+        offset = next_offset
+
+    return manifest
+
+def _prepare_collection(client, manifest: Dict[str, Any], recreate: bool) -> None:
+    from qdrant_client.http import models as rest
+
+    names = {c.name for c in client.get_collections().collections}
+    if recreate or COLLECTION_NAME not in names:
+        client.recreate_collection(
+            collection_name=COLLECTION_NAME,
+            vectors_config=rest.VectorParams(
+                size=manifest["vector_size"],
+                distance=rest.Distance(manifest["distance"]),
+            ),
+        )
+        return
+    vectors = client.get_collection(COLLECTION_NAME).config.params.vectors
+    if isinstance(vectors, dict) or vectors.size != manifest["vector_size"]:
+        raise ValueError("The collection's vector config does not match the snapshot; import with recreate")
+
+def _import_state_path(path: str) -> str:
+    """
+    Get where the progress of importing a snapshot into the configured
+    stores is kept. Each target has its own state, so one snapshot can be
+    loaded into several deployments; the URIs may hold credentials, so the
+    file is named after a digest of them.
+    """
+    target = "\n".join([settings.VECTOR_DB_URL, settings.MONGODB_URI, settings.MONGODB_DB_NAME, COLLECTION_NAME])
+    digest = hashlib.sha256(target.encode()).hexdigest()[:16]
+    return os.path.join(path, f"import-{COLLECTION_NAME}-{digest}.json")
+
+async def _import_documents(path: str) -> Tuple[int, List[str]]:
+    """
+    Load the snapshot's documents, returning how many were loaded and the
+    IDs of those skipped. A document still processing when the snapshot
+    was taken never finished indexing, so it is skipped, and an update in
+    flight is dropped, leaving the version that was exported.
+    """
+    from bson import json_util
+    from pymongo import ReplaceOne
+
+    db = await get_database()
+    f = await asyncio.to_thread(gzip.open, os.path.join(path, DOCUMENTS_FILE), "rt", encoding="utf-8")
+    count = 0
+    skipped = []
+    try:
+        while True:
+            lines = await asyncio.to_thread(
+                lambda: [line for _, line in zip(range(DOCUMENTS_BATCH_SIZE), f)]
+            )
+            if not lines:
+                break
+            documents = []
+            for line in lines:
+                document = json_util.loads(line)
+                if document.get("status") == "processing":
+                    skipped.append(document["document_id"])
+                    continue
+                document.pop("pending_update", None)
+                documents.append(document)
+            if documents:
+                await db.documents.bulk_write([
+                    ReplaceOne({"document_id": d["document_id"]}, d, upsert=True)
+                    for d in documents
+                ], ordered=False)
+            count += len(documents)
+    finally:
+        await asyncio.to_thread(f.close)
+    return count, skipped
+
+async def _upsert_batch(client, ids: List[Any], vectors, texts: List[str], metadata: List[Dict[str, Any]]) -> None:
+    """
+    Write one batch of points in the layout of the current CHUNK_STORE setting
+    """
+    from qdrant_client.http import models as rest
+
+    store = get_chunk_store()
+    if store is None:
+        payloads = [{CONTENT_KEY: t, METADATA_KEY: m} for t, m in zip(texts, metadata)]
+    else:
+        by_document: Dict[str, List[Dict[str, Any]]] = {}
+        payloads = []
+        for text, chunk_metadata in zip(texts, metadata):
+            payload, rest_metadata = split_metadata(chunk_metadata)
+            payloads.append({METADATA_KEY: payload})
+            by_document.setdefault(chunk_metadata.get("document_id"), []).append({
+                "chunk_id": chunk_metadata["chunk_id"],
+                "text": text,
+                "metadata": rest_metadata,
+            })
+        for document_id, chunks in by_document.items():
+            await store.put_chunks(document_id, chunks)
+
+    await asyncio.to_thread(
+        client.upsert,
+        collection_name=COLLECTION_NAME,
+        points=rest.Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads),
+    )
+
+async def import_snapshot(
+    path: str,
+    batch_size: Optional[int] = None,
+    recreate: bool = False,
+    restart: bool = False,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Load a snapshot into MongoDB and the vector store with batched upserts,
+    reusing the exported vectors instead of re-embedding.
+
+    Imported shards are recorded next to the manifest, per target, so an
+    interrupted import picks up at the first shard not yet loaded unless
+    ``restart`` is set. Upserts are idempotent, so a partly loaded shard is
+    simply loaded again. A finished import is never resumed; importing
+    again loads the whole snapshot. Returns the import state.
+    """
+    batch_size = batch_size or settings.SNAPSHOT_UPSERT_BATCH_SIZE
+    manifest = await asyncio.to_thread(_read_json, os.path.join(path, MANIFEST_FILE))
+    if manifest is None or not manifest["complete"]:
+        raise ValueError("Snapshot is missing or incomplete; finish the export first")
+    if manifest["version"] > SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {manifest['version']}")
+
+    state_path = _import_state_path(path)
+    state = None if restart else await asyncio.to_thread(_read_json, state_path)
+    if state is None or state["complete"]:
+        state = {"documents": None, "skipped": [], "shards": [], "points": 0, "complete": False}
+
+    client = get_qdrant_client()
+    # Never drop points a resumed import already loaded
+    await asyncio.to_thread(_prepare_collection, client, manifest, recreate and not state["shards"])
+
+    if state["documents"] is None:
+        state["documents"], state["skipped"] = await _import_documents(path)
+        await asyncio.to_thread(_write_json, state_path, state)
+        if progress:
+            progress("documents", state["documents"], manifest["documents"])
+
+    done = set(state["shards"])
+    skipped = set(state["skipped"])
+    for shard in manifest["shards"]:
+        if shard["file"] in done:
+            continue
+        ids, vectors, texts, metadata = await asyncio.to_thread(_read_shard, os.path.join(path, shard["file"]))
+        if skipped:
+            # Leave out the chunks of skipped documents
+            keep = [i for i, m in enumerate(metadata) if m.get("document_id") not in skipped]
+            ids, vectors = [ids[i] for i in keep], vectors[keep]
+            texts, metadata = [texts[i] for i in keep], [metadata[i] for i in keep]
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            await _upsert_batch(client, ids[start:end], vectors[start:end], texts[start:end], metadata[start:end])
+        state["shards"].append(shard["file"])
+        state["points"] += shard["points"]
+        await asyncio.to_thread(_write_json, state_path, state)
+        if progress:
+            progress("chunks", state["points"], manifest["points"])
+
+    await asyncio.to_thread(ensure_payload_indexes, client, COLLECTION_NAME)
+    db = await get_database()
+    for user_id in await db.documents.distinct("user_id"):
+        await bump_corpus_generation(user_id)
+
+    state["complete"] = True
+    await asyncio.to_thread(_write_json, state_path, state)
+    return state
+
+def snapshot_path(name: str) -> str:
+    return os.path.join(settings.SNAPSHOT_DIR, name)
+
+async def get_snapshot_job(job_id: str) -> Optional[Dict[str, Any]]:
+    db = await get_database()
+    return await db.snapshot_jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+async def create_snapshot_job(kind: str, name: str) -> Optional[Dict[str, Any]]:
+    """
+    Record a new running job for a snapshot, or return None if another job
+    is running for it. The unique index on the names of running jobs makes
+    this a lock across replicas.
+    """
+    from pymongo.errors import DuplicateKeyError
+
+    db = await get_database()
+    now = datetime.utcnow()
+    # Release the name if its job stopped reporting
+    await db.snapshot_jobs.update_many(
+        {"name": name, "status": "running", "updated_at": {"$lt": now - timedelta(seconds=JOB_STALE_SECONDS)}},
+        {"$set": {"status": "failed", "error": "Job stopped responding", "finished_at": now}},
+    )
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "kind": kind,
+        "name": name,
+        "status": "running",
+        "stage": None,
+        "done": 0,
+        "total": 0,
+        "error": None,
+        "started_at": now,
+        "updated_at": now,
+        "finished_at": None,
+    }
+    try:
+        await db.snapshot_jobs.insert_one(job)
+    except DuplicateKeyError:
+        return None
+    job.pop("_id", None)
+    return job
+
+async def _report_progress(job: Dict[str, Any]) -> None:
+    db = await get_database()
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        await db.snapshot_jobs.update_one(
+            {"job_id": job["job_id"]},
+            {"$set": {
+                "stage": job["stage"],
+                "done": job["done"],
+                "total": job["total"],
+                "updated_at": datetime.utcnow(),
+            }},
+        )
+
+async def run_snapshot_job(job: Dict[str, Any], **options) -> None:
+    """
+    Run an export or import job, recording its progress on the job
+    """
+    def _progress(stage: str, done: int, total: int) -> None:
+        job.update(stage=stage, done=done, total=total)
+
+    run = export_snapshot if job["kind"] == "export" else import_snapshot
+    reporter = asyncio.create_task(_report_progress(job))
+    try:
+        await run(snapshot_path(job["name"]), progress=_progress, **options)
+        job["status"] = "complete"
+    except asyncio.CancelledError:
+        job.update(status="failed", error="Job was cancelled")
+        raise
+    except Exception as e:
+        job.update(status="failed", error=str(e))
+    finally:
+        reporter.cancel()
+        await asyncio.gather(reporter, return_exceptions=True)
+        now = datetime.utcnow()
+        job.update(updated_at=now, finished_at=now)
+        db = await get_database()
+        await db.snapshot_jobs.update_one(
+            {"job_id": job["job_id"]},
+            {"$set": {key: value for key, value in job.items() if key != "job_id"}},
+        )
@@ -0,0 +1,56 @@
+import re
+from typing import List
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def query_terms(query: str) -> List[str]:
+    """
+    Split a query into lowercase terms worth matching in a snippet
+    """
+    return [term for term in _WORD_RE.findall(query.lower()) if len(term) > 1]
+
+def make_snippet(text: str, query: str, length: int = 200) -> str:
+    """
+    Build an excerpt of roughly ``length`` characters centered on the part of
+    ``text`` with the most query-term matches. Falls back to the start of the
+    text when no term matches.
+    """
+    if len(text) <= length:
+        return text
+
+    lowered = text.lower()
+    positions = []
+    for term in query_terms(query):
+        positions.extend(m.start() for m in re.finditer(re.escape(term), lowered))
+    positions.sort()
+
+    start = 0
+    if positions:
+        # Pick the window that covers the most matches, centered on its first one
+        best_count = 0
+        for i, position in enumerate(positions):
+            count = 1
+            while i + count < len(positions) and positions[i + count] - position < length // 2:
+                count += 1
+            if count > best_count:
+                best_count = count
+                start = max(0, position - length // 2)
+    start = min(start, len(text) - length)
+    end = start + length
+
+    # Snap to whitespace so the excerpt doesn't cut words in half
+    if start > 0:
+        space = text.find(" ", start, start + 20)
+        if space != -1:
+            start = space + 1
+    if end < len(text):
+        space = text.rfind(" ", end - 20, end)
+        if space != -1:
+            end = space
+
+    snippet = text[start:end].strip()
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(text):
+        snippet = snippet + "…"
+    return snippet
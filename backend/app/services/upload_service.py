@@ -0,0 +1,372 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..db.mongodb import get_database
+
+logger = logging.getLogger(__name__)
+
+class UploadTooLarge(Exception):
+    """
+    Raised when an upload exceeds the size limit or the user's storage quota
+    """
+
+class UploadOffsetMismatch(Exception):
+    """
+    Raised when a resumable chunk does not start at the session's current offset
+    """
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+class UploadInProgress(Exception):
+    """
+    Raised when another request is already writing to a resumable upload
+    """
+
+class DuplicateDocument(Exception):
+    """
+    Raised when a new version of a document has the same content as another
+    document of the user
+    """
+
+    def __init__(self, document_id: str):
+        super().__init__(f"Document {document_id} already has this content")
+        self.document_id = document_id
+
+# Running hashes of resumable uploads whose chunks arrived at this process,
+# keyed by upload_id. A miss (restart, another pod) falls back to re-hashing
+# the spooled file when the upload completes.
+_hashers = TTLCache(max_entries=1024, ttl_seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+# A chunk request holds its upload's writer lease for at most this long;
+# well past the uploads route deadline, so only a crashed writer's lease
+# is ever taken over
+WRITER_LEASE_SECONDS = 600
+
+def detect_file_type(filename: str) -> str:
+    """
+    Determine the document type from a file name
+    """
+    file_extension = os.path.splitext(filename)[1].lower()
+    if file_extension in [".pdf"]:
+        return "pdf"
+    elif file_extension in [".docx", ".doc"]:
+        return "docx"
+    elif file_extension in [".md", ".markdown"]:
+        return "markdown"
+    elif file_extension in [".txt", ".rst"]:
+        return "text"
+    return "unknown"
+
+def _spool_path(name: str) -> str:
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    return os.path.join(settings.UPLOAD_TEMP_DIR, name)
+
+async def get_user_storage_usage(user_id: str) -> int:
+    """
+    Get the total size of the documents a user has stored
+    """
+    db = await get_database()
+    cursor = db.documents.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "total": {"$sum": "$file_size"}}},
+    ])
+    async for row in cursor:
+        return row["total"]
+    return 0
+
+async def get_upload_limit(user_id: str) -> int:
+    """
+    Get the largest upload a user may make right now, taking the per-file
+    limit and their remaining storage quota into account
+    """
+    limit = settings.UPLOAD_MAX_BYTES
+    if settings.UPLOAD_USER_QUOTA_BYTES:
+        remaining = settings.UPLOAD_USER_QUOTA_BYTES - await get_user_storage_usage(user_id)
+        limit = min(limit, max(remaining, 0))
+    return limit
+
+async def find_duplicate_document(user_id: str, content_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a document of this user with exactly the same content, including
+    one that is still being processed
+    """
+    db = await get_database()
+    return await db.documents.find_one({"user_id": user_id, "content_hash": content_hash})
+
+async def spool_stream(
+    chunks: AsyncIterator[bytes],
+    path: str,
+    max_bytes: int,
+    offset: int = 0,
+    hasher=None
+) -> int:
+    """
+    Write a stream of chunks to ``path`` starting at ``offset``, with disk
+    I/O offloaded to a worker thread so the event loop is never blocked.
+    Feeds each chunk to ``hasher`` if given and returns the bytes written.
+    Raises UploadTooLarge as soon as more than ``max_bytes`` arrive.
+    """
+    written = 0
+    f = await asyncio.to_thread(open, path, "r+b" if offset else "wb")
+    try:
+        if offset:
+            # Drop anything written past the last acknowledged offset
+            await asyncio.to_thread(f.seek, offset)
+            await asyncio.to_thread(f.truncate)
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            written += len(chunk)
+            if written > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds the limit of {max_bytes} bytes")
+            if hasher is not None:
+                hasher.update(chunk)
+            await asyncio.to_thread(f.write, chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+    return written
+
+async def hash_file(path: str) -> str:
+    """
+    Compute the SHA-256 of a file off the event loop
+    """
+    def _hash() -> str:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            while block := f.read(settings.UPLOAD_CHUNK_SIZE):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    return await asyncio.to_thread(_hash)
+
+async def spool_upload_file(file, path: str, max_bytes: int) -> Tuple[int, str]:
+    """
+    Spool an UploadFile to disk, returning its size and SHA-256
+    """
+    async def _chunks():
+        while content := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            yield content
+
+    hasher = hashlib.sha256()
+    try:
+        file_size = await spool_stream(_chunks(), path, max_bytes, hasher=hasher)
+    except UploadTooLarge:
+        await asyncio.to_thread(_remove, path)
+        raise
+    return file_size, hasher.hexdigest()
+
+def _touch(path: str) -> None:
+    with open(path, "wb"):
+        pass
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+async def create_upload_session(
+    user_id: str,
+    filename: str,
+    size: int,
+    title: str,
+    description: Optional[str] = None,
+    tags: List[str] = []
+) -> Dict[str, Any]:
+    """
+    Start a resumable upload after checking its declared size against the
+    size limit and quota, before any data is sent
+    """
+    if size > await get_upload_limit(user_id):
+        raise UploadTooLarge("Upload exceeds the size limit or storage quota")
+
+    upload_id = str(uuid.uuid4())
+    path = _spool_path(f"{upload_id}.part")
+    await asyncio.to_thread(_touch, path)
+
+    now = datetime.utcnow()
+    session = {
+        "upload_id": upload_id,
+        "user_id": user_id,
+        "filename": filename,
+        "file_type": detect_file_type(filename),
+        "size": size,
+        "offset": 0,
+        "path": path,
+        "title": title,
+        "description": description,
+        "tags": tags,
+        "created_at": now,
+        "updated_at": now,
+    }
+    db = await get_database()
+    await db.upload_sessions.insert_one(session)
+    _hashers.set(upload_id, (0, hashlib.sha256()))
+    session.pop("_id", None)
+    return session
+
+async def get_upload_session(upload_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a resumable upload session owned by the user
+    """
+    db = await get_database()
+    return await db.upload_sessions.find_one(
+        {"upload_id": upload_id, "user_id": user_id},
+        {"_id": 0},
+    )
+
+async def append_upload_chunk(
+    session: Dict[str, Any],
+    offset: int,
+    chunks: AsyncIterator[bytes]
+) -> int:
+    """
+    Append a chunk to a resumable upload at ``offset`` and return the new
+    offset. The chunk may not run past the declared size, and only one
+    request at a time may write to an upload; others get UploadInProgress.
+    """
+    if offset != session["offset"]:
+        raise UploadOffsetMismatch(session["offset"])
+
+    upload_id = session["upload_id"]
+    lease_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    db = await get_database()
+    result = await db.upload_sessions.update_one(
+        {
+            "upload_id": upload_id,
+            "offset": offset,
+            "$or": [
+                {"writer": {"$exists": False}},
+                {"writer.started_at": {"$lt": now - timedelta(seconds=WRITER_LEASE_SECONDS)}},
+            ],
+        },
+        {"$set": {"writer": {"id": lease_id, "started_at": now}, "updated_at": now}},
+    )
+    if result.modified_count == 0:
+        current = await get_upload_session(upload_id, session["user_id"])
+        if current is not None and current["offset"] != offset:
+            raise UploadOffsetMismatch(current["offset"])
+        raise UploadInProgress("Another request is writing to this upload")
+
+    # The running hash belongs to this stream until it is put back
+    running = _hashers.get(upload_id)
+    _hashers.pop(upload_id)
+    hasher = running[1] if running is not None and running[0] == offset else None
+
+    try:
+        written = await spool_stream(
+            chunks,
+            session["path"],
+            max_bytes=session["size"] - offset,
+            offset=offset,
+            hasher=hasher,
+        )
+    except BaseException:
+        # The running hash may have seen bytes that were never acknowledged,
+        # so it is not put back
+        await db.upload_sessions.update_one(
+            {"upload_id": upload_id, "writer.id": lease_id},
+            {"$unset": {"writer": ""}},
+        )
+        raise
+    new_offset = offset + written
+
+    # Advance and release the lease, unless it was taken over meanwhile
+    result = await db.upload_sessions.update_one(
+        {"upload_id": upload_id, "writer.id": lease_id},
+        {"$set": {"offset": new_offset, "updated_at": datetime.utcnow()}, "$unset": {"writer": ""}},
+    )
+    if result.modified_count == 0:
+        current = await get_upload_session(upload_id, session["user_id"])
+        raise UploadOffsetMismatch(current["offset"] if current else offset)
+
+    if hasher is not None:
+        _hashers.set(upload_id, (new_offset, hasher))
+    session["offset"] = new_offset
+    return new_offset
+
+async def finish_upload_session(session: Dict[str, Any]) -> str:
+    """
+    Close a completed resumable upload and return the content hash of the
+    spooled file, which is left in place for processing
+    """
+    upload_id = session["upload_id"]
+    running = _hashers.get(upload_id)
+    _hashers.pop(upload_id)
+    if running is not None and running[0] == session["size"]:
+        content_hash = running[1].hexdigest()
+    else:
+        content_hash = await hash_file(session["path"])
+
+    db = await get_database()
+    await db.upload_sessions.delete_one({"upload_id": upload_id})
+    return content_hash
+
+async def cancel_upload_session(session: Dict[str, Any]) -> None:
+    """
+    Abort a resumable upload and remove its spooled data
+    """
+    _hashers.pop(session["upload_id"])
+    await asyncio.to_thread(_remove, session["path"])
+    db = await get_database()
+    await db.upload_sessions.delete_one({"upload_id": session["upload_id"]})
+
+def _stale_spool_files(max_age: float) -> List[Tuple[str, str]]:
+    cutoff = time.time() - max_age
+    stale = []
+    with os.scandir(settings.UPLOAD_TEMP_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(".part") and entry.stat().st_mtime < cutoff:
+                stale.append((entry.name[:-len(".part")], entry.path))
+    return stale
+
+async def sweep_stale_uploads() -> int:
+    """
+    Remove the spool files of resumable uploads whose session has expired.
+    Every chunk touches the file, so one untouched for the session TTL
+    belongs to an abandoned upload. Returns how many files were removed.
+    """
+    if not os.path.isdir(settings.UPLOAD_TEMP_DIR):
+        return 0
+    stale = await asyncio.to_thread(_stale_spool_files, settings.UPLOAD_SESSION_TTL_SECONDS)
+    if not stale:
+        return 0
+
+    db = await get_database()
+    live = set()
+    cursor = db.upload_sessions.find(
+        {"upload_id": {"$in": [upload_id for upload_id, _ in stale]}},
+        {"upload_id": 1},
+    )
+    async for session in cursor:
+        live.add(session["upload_id"])
+
+    removed = 0
+    for upload_id, path in stale:
+        if upload_id not in live:
+            await asyncio.to_thread(_remove, path)
+            removed += 1
+    return removed
+
+async def run_upload_sweeper() -> None:
+    """
+    Sweep abandoned upload spool files every UPLOAD_SWEEP_INTERVAL_SECONDS
+    until cancelled
+    """
+    while True:
+        await asyncio.sleep(settings.UPLOAD_SWEEP_INTERVAL_SECONDS)
+        try:
+            removed = await sweep_stale_uploads()
+            if removed:
+                logger.info("Removed %d abandoned upload spool files", removed)
+        except Exception:
+            logger.exception("Sweeping upload spool files failed")
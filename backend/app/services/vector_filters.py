@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+# LangChain's Qdrant integration nests chunk metadata under this payload key
+METADATA_KEY = "metadata"
+
+# Chunk metadata fields that can be filtered on, with their payload index type.
+# Chunks indexed before tags, file_type and created_at_ts were written lack
+# them until scripts/backfill_filter_fields.py has run.
+FILTERABLE_FIELDS = {
+    "user_id": "keyword",
+    "document_id": "keyword",
+    "tags": "keyword",
+    "file_type": "keyword",
+    "title": "keyword",
+    "created_at_ts": "float",
+}
+
+def to_timestamp(value: datetime) -> float:
+    """
+    Convert a datetime to a POSIX timestamp, treating naive values as UTC
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _match(field: str, value: Any):
+    from qdrant_client.http import models as rest
+    
+    key = f"{METADATA_KEY}.{field}"
+    if isinstance(value, (list, tuple, set)):
+        return rest.FieldCondition(key=key, match=rest.MatchAny(any=list(value)))
+    return rest.FieldCondition(key=key, match=rest.MatchValue(value=value))
+
+def build_search_filter(user_id: Optional[str], filters: Dict[str, Any] = {}):
+    """
+    Compile search filters into a native Qdrant filter.
+
+    Supported keys: tags (matches any), document_id, file_type (a value or a
+    list of values), title (exact match), created_after and created_before.
+    """
+    from qdrant_client.http import models as rest
+
+    conditions = []
+
+    if user_id:
+        conditions.append(_match("user_id", user_id))
+
+    for field in ("tags", "document_id", "file_type", "title"):
+        value = filters.get(field)
+        if value is None:
+            continue
+        if field == "tags" and isinstance(value, str):
+            value = [value]
+        conditions.append(_match(field, value))
+
+    created_after = filters.get("created_after")
+    created_before = filters.get("created_before")
+    if created_after is not None or created_before is not None:
+        conditions.append(rest.FieldCondition(
+            key=f"{METADATA_KEY}.created_at_ts",
+            range=rest.Range(
+                gte=to_timestamp(created_after) if created_after else None,
+                lte=to_timestamp(created_before) if created_before else None,
+            ),
+        ))
+
+    if not conditions:
+        return None
+    return rest.Filter(must=conditions)
+
+def ensure_payload_indexes(client, collection_name: str) -> None:
+    """
+    Create payload indexes for the filterable fields so filtering runs
+    inside the index instead of scanning payloads
+    """
+    from qdrant_client.http import models as rest
+    
+    for field, schema in FILTERABLE_FIELDS.items():
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=f"{METADATA_KEY}.{field}",
+            field_schema=rest.PayloadSchemaType(schema),
+        )
@@ -0,0 +1,13 @@
+import os
+
+# Settings require these; tests never reach the real services
+for name, value in {
+    "MONGODB_URI": "mongodb://localhost:27017",
+    "AZURE_AD_TENANT_ID": "test",
+    "AZURE_AD_CLIENT_ID": "test",
+    "AZURE_AD_CLIENT_SECRET": "test",
+    "AZURE_OPENAI_API_KEY": "test",
+    "AZURE_OPENAI_API_BASE": "https://example.openai.azure.com",
+    "AZURE_OPENAI_DEPLOYMENT_NAME": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,25 @@
+"""
+Backfill the filterable chunk metadata of documents indexed before it existed.
+
+Search filters on tags, file type and creation time match the vector store
+payload, which older ingestions never wrote, so those chunks drop out of any
+filtered search until this has run. It copies the fields from the documents
+collection and can be run again safely.
+
+Run from the backend directory with the usual environment configured:
+
+    python -m scripts.backfill_filter_fields
+"""
+import asyncio
+import time
+
+from app.services.knowledge_service import backfill_filter_fields
+
+async def main() -> None:
+    start = time.perf_counter()
+    result = await backfill_filter_fields()
+    print(f"Updated {result['points']} chunks of {result['documents']} documents "
+          f"in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Microbenchmark for /knowledge/search response serialization.
+
+Compares the two paths the endpoint has taken, both through FastAPI's own
+``serialize_response``: before, it returned a plain dict checked against an
+untyped ``List[Dict[str, Any]]`` response model and rendered by
+``JSONResponse``; now it builds a ``SearchResponse`` from the service's dicts,
+which FastAPI dumps (excluding None) and validates again before
+``ORJSONResponse`` renders it. Timings include building the model.
+
+Run from the backend directory with the usual environment configured:
+
+    python -m scripts.bench_serialization --hits 50 --repeat 200 --rounds 5
+"""
+import argparse
+import asyncio
+import random
+import string
+import time
+from typing import Any, Dict, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from app.api.endpoints.knowledge import SearchMetadata, SearchResponse
+
+class UntypedSearchResponse(BaseModel):
+    results: List[Dict[str, Any]]
+    metadata: Dict[str, Any] = {}
+
+def make_response(hits: int) -> Dict[str, Any]:
+    results = []
+    for i in range(hits):
+        results.append({
+            "content": "".join(random.choices(string.ascii_letters + " ", k=1000)),
+            "metadata": {
+                "document_id": f"doc-{i}",
+                "chunk_id": f"doc-{i}-{i}",
+                "title": f"Document {i}",
+                "tags": ["finance", "q3"],
+                "file_type": "pdf",
+                "created_at_ts": 1700000000.0 + i,
+                "page": i % 20,
+                "source": "upload",
+            },
+            "score": random.random(),
+        })
+    return {
+        "results": results,
+        "metadata": {"total": hits, "query": "quarterly revenue", "cache_hit": False, "cache_hit_ratio": 0.5},
+    }
+
+def build_typed(content: Dict[str, Any]) -> SearchResponse:
+    # As search_documents_endpoint does
+    return SearchResponse(results=content["results"], metadata=SearchMetadata(**content["metadata"]))
+
+async def render(field, response_class, build, content, exclude_none: bool) -> bytes:
+    value = await serialize_response(field=field, response_content=build(content), exclude_none=exclude_none)
+    return response_class(value).body
+
+async def bench(field, response_class, build, content, exclude_none: bool, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await render(field, response_class, build, content, exclude_none)
+    return (time.perf_counter() - start) / repeat * 1000
+
+async def main(hits: int, repeat: int, rounds: int) -> None:
+    content = make_response(hits)
+    variants = {
+        "untyped dict + JSONResponse": (
+            create_response_field("response", UntypedSearchResponse), JSONResponse, lambda c: c, False,
+        ),
+        "typed model + ORJSONResponse": (
+            create_response_field("response", SearchResponse), ORJSONResponse, build_typed, True,
+        ),
+    }
+    # Alternate the variants and keep each one's best round, so noise from
+    # other processes doesn't favour whichever happened to run first
+    best = {label: float("inf") for label in variants}
+    for _ in range(rounds):
+        for label, (field, response_class, build, exclude_none) in variants.items():
+            per_call_ms = await bench(field, response_class, build, content, exclude_none, repeat)
+            best[label] = min(best[label], per_call_ms)
+    for label, per_call_ms in best.items():
+        print(f"{label:<32} {per_call_ms:8.3f} ms/response")
+    untyped, typed = best.values()
+    print(f"speedup: {untyped / typed:.2f}x at k={hits}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hits", type=int, default=50, help="search hits per response")
+    parser.add_argument("--repeat", type=int, default=200, help="responses to serialize per round")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per variant; the best is reported")
+    args = parser.parse_args()
+    asyncio.run(main(args.hits, args.repeat, args.rounds))
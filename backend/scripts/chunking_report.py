@@ -0,0 +1,97 @@
+"""
+Offline chunking report for the knowledge base splitter profiles.
+
+Loads each file the same way uploads are processed, splits it with the
+profile for its file type and prints the number of chunks and the tokens
+that would be sent for embedding, per profile. ``--baseline`` adds the
+previous fixed 1000/100 character splitter for comparison. Nothing is
+embedded or stored.
+
+Run from the backend directory with the usual environment configured:
+
+    python -m scripts.chunking_report docs/*.pdf docs/*.md --baseline
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+from app.core.tokens import count_tokens
+from app.services.chunking import get_chunking_profile, load_document, split_documents
+from app.services.upload_service import detect_file_type
+
+def baseline_split(documents: list) -> list:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100).split_documents(documents)
+
+def summarize(label: str, files: int, token_counts: List[int], min_tokens: int = 0) -> Dict:
+    return {
+        "profile": label,
+        "files": files,
+        "chunks": len(token_counts),
+        "embedding_tokens": sum(token_counts),
+        "mean": sum(token_counts) / len(token_counts) if token_counts else 0.0,
+        "min": min(token_counts, default=0),
+        "max": max(token_counts, default=0),
+        "undersized": sum(1 for n in token_counts if n < min_tokens),
+    }
+
+def build_report(paths: List[str], overrides: Dict[str, int], baseline: bool) -> List[Dict]:
+    profiles = {}
+    files = defaultdict(int)
+    tokens: Dict[str, List[int]] = defaultdict(list)
+    for path in paths:
+        file_type = detect_file_type(path)
+        profile = {**get_chunking_profile(file_type), **overrides}
+        profile_name = file_type if file_type != "unknown" else "text"
+        profiles[profile_name] = profile
+
+        documents = load_document(path, file_type)
+        chunks = split_documents(documents, file_type, profile)
+        files[profile_name] += 1
+        tokens[profile_name].extend(count_tokens(c.page_content) for c in chunks)
+        if baseline:
+            files["baseline"] += 1
+            tokens["baseline"].extend(count_tokens(c.page_content) for c in baseline_split(documents))
+
+    rows = [
+        summarize(name, files[name], tokens[name], profile["min_tokens"])
+        for name, profile in sorted(profiles.items())
+    ]
+    if baseline:
+        rows.append(summarize("baseline", files["baseline"], tokens["baseline"]))
+    return rows
+
+def print_report(rows: List[Dict]) -> None:
+    print(f"{'profile':<10} {'files':>6} {'chunks':>7} {'tokens':>9} {'mean':>7} {'min':>5} {'max':>5} {'small':>6}")
+    for row in rows:
+        print(
+            f"{row['profile']:<10} {row['files']:>6} {row['chunks']:>7} {row['embedding_tokens']:>9} "
+            f"{row['mean']:>7.1f} {row['min']:>5} {row['max']:>5} {row['undersized']:>6}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="files to chunk")
+    parser.add_argument("--chunk-tokens", type=int, help="override chunk_tokens for every profile")
+    parser.add_argument("--overlap-tokens", type=int, help="override overlap_tokens for every profile")
+    parser.add_argument("--min-tokens", type=int, help="override min_tokens for every profile")
+    parser.add_argument("--baseline", action="store_true", help="include the old 1000/100 character splitter")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    overrides = {
+        key: value
+        for key, value in {
+            "chunk_tokens": args.chunk_tokens,
+            "overlap_tokens": args.overlap_tokens,
+            "min_tokens": args.min_tokens,
+        }.items()
+        if value is not None
+    }
+    rows = build_report(args.paths, overrides, args.baseline)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
@@ -0,0 +1,62 @@
+"""
+Export or import a knowledge-base snapshot.
+
+An export writes the documents collection and every vector store point
+(vector, chunk text, metadata) to compressed NPZ shards in a directory; an
+import bulk-loads one back with batched upserts, without re-embedding.
+Both resume where they stopped when run again on the same directory.
+
+Run from the backend directory with the usual environment configured:
+
+    python -m scripts.kb_snapshot export /backups/kb-2024-06-01
+    python -m scripts.kb_snapshot import /backups/kb-2024-06-01 --recreate
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.services.snapshot_service import export_snapshot, import_snapshot
+
+def print_progress(stage: str, done: int, total: int) -> None:
+    percent = done / total * 100 if total else 100.0
+    print(f"{time.strftime('%H:%M:%S')} {stage:<10} {done:>10}/{total:<10} {percent:5.1f}%", file=sys.stderr)
+
+async def main(args: argparse.Namespace) -> None:
+    start = time.perf_counter()
+    if args.command == "export":
+        result = await export_snapshot(
+            args.path,
+            shard_size=args.shard_size,
+            restart=args.restart,
+            progress=print_progress,
+        )
+        print(f"Exported {result['documents']} documents and {result['points']} chunks "
+              f"in {len(result['shards'])} shards to {args.path}")
+    else:
+        result = await import_snapshot(
+            args.path,
+            batch_size=args.batch_size,
+            recreate=args.recreate,
+            restart=args.restart,
+            progress=print_progress,
+        )
+        print(f"Imported {result['documents']} documents and {result['points']} chunks from {args.path}")
+    print(f"Took {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="write a snapshot of the knowledge base")
+    export_parser.add_argument("path", help="snapshot directory")
+    export_parser.add_argument("--shard-size", type=int, help="points per shard")
+    export_parser.add_argument("--restart", action="store_true", help="start over instead of resuming")
+
+    import_parser = subparsers.add_parser("import", help="load a snapshot into the knowledge base")
+    import_parser.add_argument("path", help="snapshot directory")
+    import_parser.add_argument("--batch-size", type=int, help="points per upsert request")
+    import_parser.add_argument("--recreate", action="store_true", help="drop and recreate the collection first")
+    import_parser.add_argument("--restart", action="store_true", help="start over instead of resuming")
+
+    asyncio.run(main(parser.parse_args()))
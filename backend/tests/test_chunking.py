@@ -0,0 +1,72 @@
+from langchain.schema import Document
+
+from app.services.chunking import _shared_headings, merge_small_chunks, split_documents
+
+PROFILE = {"chunk_tokens": 100, "overlap_tokens": 5, "min_tokens": 20}
+
+def test_shared_headings_nested_sections():
+    assert _shared_headings({"h1": "A"}, {"h1": "A", "h2": "B"}) == 1
+    assert _shared_headings({"h1": "A", "h2": "B", "h3": "C"}, {"h1": "A"}) == 1
+
+def test_shared_headings_sibling_sections():
+    assert _shared_headings({"h1": "A", "h2": "B"}, {"h1": "A", "h2": "C"}) == 1
+
+def test_shared_headings_rejects_unrelated_sections():
+    assert _shared_headings({"h1": "A", "h2": "B"}, {"h1": "C", "h2": "D"}) is None
+    assert _shared_headings({"h1": "A", "h2": "B", "h3": "C"}, {"h1": "A", "h2": "D"}) is None
+
+def test_shared_headings_rejects_other_pages():
+    assert _shared_headings({"page": 1}, {"page": 2}) is None
+    assert _shared_headings({"page": 1, "h1": "A"}, {"page": 1, "h1": "A"}) == 1
+
+def test_merge_drops_overlap_within_a_section():
+    chunks = [
+        Document(page_content="alpha beta gamma", metadata={"page": 0}),
+        Document(page_content="gamma delta", metadata={"page": 0}),
+    ]
+    merged = merge_small_chunks(chunks, PROFILE)
+    assert [c.page_content for c in merged] == ["alpha beta gamma delta"]
+
+def test_merge_keeps_page_boundary():
+    chunks = [
+        Document(page_content="end of page one", metadata={"page": 0}),
+        Document(page_content="start of page two", metadata={"page": 1}),
+    ]
+    merged = merge_small_chunks(chunks, PROFILE)
+    assert [c.page_content for c in merged] == ["end of page one", "start of page two"]
+
+def test_merge_nested_section_into_parent():
+    chunks = [
+        Document(page_content="# A\nintro", metadata={"h1": "A"}),
+        Document(page_content="# A\n## B\ndetails", metadata={"h1": "A", "h2": "B"}),
+    ]
+    merged = merge_small_chunks(chunks, PROFILE)
+    assert len(merged) == 1
+    assert merged[0].page_content == "# A\nintro\n\n## B\ndetails"
+    assert merged[0].metadata == {"h1": "A"}
+
+def test_merge_sibling_sections_keeps_shared_heading_once():
+    chunks = [
+        Document(page_content="# A\n## B\nfirst", metadata={"h1": "A", "h2": "B"}),
+        Document(page_content="# A\n## C\nsecond", metadata={"h1": "A", "h2": "C"}),
+    ]
+    merged = merge_small_chunks(chunks, PROFILE)
+    assert len(merged) == 1
+    assert merged[0].page_content == "# A\n## B\nfirst\n\n## C\nsecond"
+    assert merged[0].metadata == {"h1": "A"}
+
+def test_merge_leaves_chunks_that_would_grow_too_large():
+    long_text = " ".join(["word"] * 90)
+    chunks = [
+        Document(page_content=long_text, metadata={}),
+        Document(page_content="short tail words here", metadata={}),
+    ]
+    assert len(merge_small_chunks(chunks, PROFILE)) == 2
+
+def test_split_keeps_full_stop_with_its_sentence():
+    text = " ".join(f"Sentence number {i} talks about something." for i in range(60))
+    chunks = split_documents([Document(page_content=text, metadata={})], "text", PROFILE)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert not chunk.page_content.startswith(".")
+        assert chunk.page_content.endswith(".")
@@ -0,0 +1,97 @@
+import asyncio
+
+from fastapi import BackgroundTasks, FastAPI
+from pymongo import _csot
+
+from app.core.deadlines import remaining_time
+from app.core.load_shedding import LoadSheddingMiddleware
+
+GROUPS = {"work": {"routes": ["/work"], "limit": 1, "queue": 0, "deadline_seconds": 0.2}}
+
+def make_app(events):
+    app = FastAPI()
+
+    async def background_job():
+        events["deadline_in_background"] = remaining_time()
+        events["mongo_timeout_in_background"] = _csot.get_timeout()
+        events["active_in_background"] = events["group"].active
+        await asyncio.sleep(0.4)
+        events["background_finished"] = True
+
+    @app.post("/work/background")
+    async def with_background(background_tasks: BackgroundTasks):
+        events["mongo_timeout_in_handler"] = _csot.get_timeout()
+        background_tasks.add_task(background_job)
+        return {"queued": True}
+
+    @app.post("/work/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        return {"done": True}
+
+    middleware = LoadSheddingMiddleware(app, GROUPS)
+    events["group"] = middleware.match("POST", "/work")
+    return middleware
+
+async def call(app, path):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "POST",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"], messages
+
+def test_background_tasks_outlive_the_deadline_and_free_the_slot():
+    events = {}
+    app = make_app(events)
+
+    status, _ = asyncio.run(call(app, "/work/background"))
+
+    assert status == 200
+    assert events["background_finished"]
+    assert events["deadline_in_background"] is None
+    assert events["mongo_timeout_in_handler"] is not None
+    assert events["mongo_timeout_in_background"] is None
+    assert events["active_in_background"] == 0
+
+def test_slow_handler_gets_504_at_the_deadline():
+    events = {}
+    app = make_app(events)
+
+    status, _ = asyncio.run(call(app, "/work/slow"))
+
+    assert status == 504
+    assert events["group"].active == 0
+
+def test_full_group_is_shed_with_retry_after():
+    events = {}
+    app = make_app(events)
+
+    async def run_both():
+        first = asyncio.ensure_future(call(app, "/work/slow"))
+        await asyncio.sleep(0.05)
+        second = await call(app, "/work/slow")
+        return await first, second
+
+    (first_status, _), (second_status, messages) = asyncio.run(run_both())
+
+    assert first_status == 504
+    assert second_status == 503
+    assert (b"retry-after", b"1") in messages[0]["headers"]
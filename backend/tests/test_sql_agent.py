@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+from langchain.schema import AIMessage
+from sqlalchemy import create_engine
+
+from app.agent import orchestrator, sql_agent
+from app.agent.sql_agent import check_read_only, normalize_sql
+from app.core.config import settings
+from app.db.sql import close_sql_engine
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM orders",
+    "select id, total from orders where status = 'paid'",
+    "WITH recent AS (SELECT * FROM orders) SELECT count(*) FROM recent",
+    "SELECT 'a; b' AS text",
+    "SELECT 'drop table users' AS text",
+    'SELECT "update" FROM audit',
+    "SELECT updated_at, created_into FROM orders",
+    "SELECT replace(name, 'a', 'b') FROM users",
+])
+def test_check_read_only_allows_queries(sql):
+    check_read_only(sql)
+
+@pytest.mark.parametrize("sql", [
+    "",
+    "DELETE FROM orders",
+    "UPDATE orders SET total = 0",
+    "SELECT 1; DROP TABLE orders",
+    "WITH gone AS (DELETE FROM orders RETURNING *) SELECT * FROM gone",
+    "WITH x AS (UPDATE orders SET total = 0 RETURNING id) SELECT id FROM x",
+    "SELECT set_config('default_transaction_read_only', 'off', false)",
+    "SELECT * INTO backup FROM orders",
+    "SELECT * FROM orders FOR UPDATE",
+    "PRAGMA query_only = OFF",
+    "SET TRANSACTION READ WRITE",
+])
+def test_check_read_only_rejects_writes(sql):
+    with pytest.raises(ValueError):
+        check_read_only(sql)
+
+def test_normalize_sql_ignores_case_whitespace_and_semicolon():
+    assert normalize_sql("SELECT *\n  FROM   Orders;") == normalize_sql("select * from orders")
+
+def test_normalize_sql_keeps_string_literals():
+    assert normalize_sql("SELECT * FROM t WHERE name = 'Ann  Lee'") == normalize_sql("select * from t where name =  'Ann  Lee'")
+    assert "'Ann  Lee'" in normalize_sql("SELECT * FROM t WHERE name = 'Ann  Lee'")
+    assert normalize_sql("SELECT 'A'") != normalize_sql("SELECT 'a'")
+
+def test_normalize_sql_keeps_quoted_identifiers():
+    assert normalize_sql('SELECT "Total" FROM "Orders"') != normalize_sql('SELECT "total" FROM "orders"')
+    assert normalize_sql('SELECT "Total"  FROM `My Table`') == 'select "Total" from `My Table`'
+    assert normalize_sql('SELECT \'a"b\' FROM T') == 'select \'a"b\' from t'
+
+class StubLLM:
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        answer = self.answers[self.calls]
+        self.calls += 1
+        return AIMessage(content=answer)
+
+@pytest.fixture
+def sqlite_agent(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'shop.db'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT, total REAL)")
+        conn.exec_driver_sql("INSERT INTO orders (status, total) VALUES ('paid', 10), ('paid', 5), ('open', 7)")
+    engine.dispose()
+
+    monkeypatch.setattr(settings, "SQL_AGENT_DATABASE_URL", url)
+    close_sql_engine()
+    for cache in (sql_agent._schema_cache, sql_agent._sql_cache, sql_agent._result_cache):
+        cache.clear()
+
+    def use_llm(*answers):
+        llm = StubLLM(answers)
+        monkeypatch.setattr(orchestrator, "get_llm", lambda temperature=0: llm)
+        return llm
+
+    yield use_llm
+    close_sql_engine()
+
+def test_run_sql_agent_caches_sql_and_results(sqlite_agent):
+    llm = sqlite_agent(
+        "```sql\nSELECT status, sum(total) AS total FROM orders GROUP BY status ORDER BY status;\n```",
+        "select status,  SUM(total) as total from orders group by status order by status",
+    )
+
+    first = asyncio.run(sql_agent.run_sql_agent("Total per order status?"))
+    assert first["sources"][0]["cached"] is False
+    assert first["sources"][0]["row_count"] == 2
+    assert "| paid | 15.0 |" in first["answer"]
+
+    # Same question: the generated SQL is reused without asking the LLM
+    again = asyncio.run(sql_agent.run_sql_agent("total per order  STATUS?"))
+    assert llm.calls == 1
+    assert again["sources"][0]["cached"] is True
+
+    # Another question whose SQL normalizes to the same query reuses the result
+    other = asyncio.run(sql_agent.run_sql_agent("How much per status?"))
+    assert llm.calls == 2
+    assert other["sources"][0]["cached"] is True
+    assert other["answer"].split("```")[-1] == first["answer"].split("```")[-1]
+
+def test_run_sql_agent_interrupts_long_queries(sqlite_agent, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_AGENT_STATEMENT_TIMEOUT_SECONDS", 0.2)
+    runaway = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT count(*) FROM n"
+    llm = sqlite_agent(runaway, runaway)
+
+    started = time.monotonic()
+    result = asyncio.run(sql_agent.run_sql_agent("Count forever"))
+    assert time.monotonic() - started < 5
+    assert result["answer"].startswith("The query could not be run")
+    assert "interrupted" in result["answer"]
+
+    # Neither the failed SQL nor a result is kept
+    asyncio.run(sql_agent.run_sql_agent("Count forever"))
+    assert llm.calls == 2
+    assert len(sql_agent._result_cache) == 0